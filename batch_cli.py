@@ -0,0 +1,204 @@
+"""Пакетная обработка фотографий без графического интерфейса.
+
+Пример:
+    python batch_cli.py photos/ "season2/*.jpg" --players players.json --output result.json --resume
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from players import PLAYERS_FILE, load_player_names
+from recognition import ScoreSheetRecognizer
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+CHUNK_SIZE = 8
+
+# Распознаватель создается один раз в каждом рабочем процессе
+_recognizer = None
+
+
+def collect_images(inputs):
+    """Раскрывает папки и шаблоны в отсортированный список изображений без повторов."""
+    file_paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        file_paths.extend(os.path.abspath(path) for path in candidates
+                          if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(set(file_paths))
+
+
+def load_image(file_path):
+    """Открывает фотографию и поворачивает ее согласно EXIF."""
+    with Image.open(file_path) as image:
+        return ImageOps.exif_transpose(image)
+
+
+def get_recognizer():
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = ScoreSheetRecognizer()
+    return _recognizer
+
+
+def process_chunk(tasks):
+    """Обрабатывает пачку изображений в рабочем процессе и возвращает записи для result.json."""
+    player_names = tasks[0][2]
+    loaded, results = [], []
+    for game_number, file_path, _ in tasks:
+        try:
+            loaded.append((game_number, file_path, load_image(file_path)))
+        except Exception as e:
+            results.append((None, f"{file_path}: {e}"))
+
+    # Цифры всех листов пачки сопоставляются с шаблонами за один проход
+    scores = get_recognizer().recognize_batch([image for _, _, image in loaded], len(player_names))
+    for (game_number, file_path, _), game_scores in zip(loaded, scores):
+        results.append(({
+            "game_number": game_number,
+            "image": file_path,
+            "players": [{"player_name": name, "result": score} for name, score in zip(player_names, game_scores)],
+        }, None))
+    return results
+
+
+def read_existing_results(json_file_path):
+    """Читает уже записанные игры, в том числе из файла, оборванного посреди записи.
+
+    Возвращает (игры, смещение в байтах сразу после последней целой игры) или
+    ([], None), если файла нет или в нем нет начала массива.
+    """
+    try:
+        # Оборванный хвост может резать символ пополам; он все равно отбрасывается
+        with open(json_file_path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return [], None
+
+    start = text.find("[")
+    if start < 0:
+        return [], None
+
+    # Разбираем по одной игре: так находится и конец последней целой записи
+    decoder = json.JSONDecoder()
+    games = []
+    position = end = start + 1
+    while True:
+        while position < len(text) and text[position] in " \r\n\t,":
+            position += 1
+        try:
+            game, position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            return games, len(text[:end].encode("utf-8"))
+        games.append(game)
+        end = position
+
+
+def load_existing_results(json_file_path):
+    """Читает уже записанные игры, в том числе из файла, оборванного посреди записи."""
+    return read_existing_results(json_file_path)[0]
+
+
+class ResultWriter:
+    """Пишет result.json потоково: файл дополняется по одной игре.
+
+    При продолжении (append_at) уже записанные игры не переписываются: файл
+    обрезается сразу после последней целой игры, и новые дописываются за ней.
+    Если процесс прервется, в файле останутся все прежние игры и
+    незакрытый массив, который читает read_existing_results.
+    """
+
+    def __init__(self, json_file_path, append_at=None, count=0):
+        if append_at is None:
+            self.file = open(json_file_path, "wb")
+            self.file.write(b"[")
+            self.count = 0
+        else:
+            self.file = open(json_file_path, "r+b")
+            self.file.truncate(append_at)
+            self.file.seek(append_at)
+            self.count = count
+
+    def write(self, game):
+        self.file.write(b",\n" if self.count else b"\n")
+        self.file.write(json.dumps(game, ensure_ascii=False).encode("utf-8"))
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.write(b"\n]\n")
+        self.file.close()
+
+
+def process_files(file_paths, player_names, output_path, workers=None, resume=False, out=sys.stderr, on_game=None,
+                  mp_context=None):
+    """Распознает изображения и потоково записывает игры в output_path. Возвращает число ошибок.
+
+    on_game, если задан, вызывается для каждой записанной игры в вызывающем потоке.
+    mp_context передается в ProcessPoolExecutor (окну нужен "spawn": fork
+    процесса с работающими пулами потоков может зависнуть).
+    """
+    existing_games, append_at = read_existing_results(output_path) if resume else ([], None)
+    done = {game.get("image") for game in existing_games}
+    # Новые игры нумеруются после уже записанных, а не по месту в заново отсортированном списке
+    first_number = max((game["game_number"] for game in existing_games
+                        if isinstance(game.get("game_number"), int)), default=0) + 1
+    pending = [path for path in file_paths if path not in done]
+    tasks = [(number, path, player_names) for number, path in enumerate(pending, start=first_number)]
+    chunks = [tasks[i:i + CHUNK_SIZE] for i in range(0, len(tasks), CHUNK_SIZE)]
+    print(f"Найдено изображений: {len(file_paths)}, к обработке: {len(tasks)}", file=out)
+
+    writer = ResultWriter(output_path, append_at, count=len(existing_games))
+    started = time.perf_counter()
+    processed = 0
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            # map отдает результаты в порядке задач, поэтому файл остается упорядоченным
+            for results in executor.map(process_chunk, chunks):
+                for game, error in results:
+                    processed += 1
+                    if error is not None:
+                        failed += 1
+                        print(f"Ошибка: {error}", file=out)
+                    else:
+                        writer.write(game)
+                        if on_game is not None:
+                            on_game(game)
+                rate = processed / max(time.perf_counter() - started, 1e-9)
+                print(f"[{processed}/{len(tasks)}] {rate:.1f} изобр./с", file=out)
+    finally:
+        writer.close()
+
+    print(f"Готово: записано игр {writer.count}, ошибок {failed}", file=out)
+    return failed
+
+
+def run(inputs, players_path, output_path, workers=None, resume=False, out=sys.stderr):
+    player_names = load_player_names(players_path)
+    return process_files(collect_images(inputs), player_names, output_path, workers=workers, resume=resume, out=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обработка папок с фотографиями листов в result.json без GUI")
+    parser.add_argument("inputs", nargs="+", help="папки или шаблоны файлов (например, 'photos/*.jpg')")
+    parser.add_argument("--players", default=PLAYERS_FILE, help="JSON-файл с именами игроков")
+    parser.add_argument("--output", default="result.json", help="куда записать результаты")
+    parser.add_argument("--workers", type=int, default=None, help="количество рабочих процессов")
+    parser.add_argument("--resume", action="store_true", help="пропустить изображения, уже записанные в --output")
+    args = parser.parse_args(argv)
+
+    failed = run(args.inputs, args.players, args.output, workers=args.workers, resume=args.resume)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
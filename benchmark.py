@@ -0,0 +1,362 @@
+"""Замеры производительности на синтетических данных.
+
+Генерирует result.json (игры x игроки) и папку фотографий разных размеров и
+форматов, замеряет загрузку, экспорт, график и открытие изображений и
+записывает результат в JSON для сравнения версий.
+
+Пример:
+    python benchmark.py --games 20000 --players 6 --images 100 --output bench.json
+    python benchmark.py --compare bench_old.json --output bench_new.json
+    python benchmark.py --xvfb  # замеры окон на виртуальном дисплее без монитора
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from players import save_player_names
+
+IMAGE_SIZES = ((4000, 3000), (1600, 1200), (800, 600))
+IMAGE_FORMATS = (("JPEG", ".jpg"), ("PNG", ".png"), ("WEBP", ".webp"))
+REGRESSION_TOLERANCE = 0.2  # замедление больше чем на 20% считается регрессией
+PUMP_TIMEOUT = 300
+
+
+# Генераторы данных
+
+def generate_results(json_file_path, games_count, players_count, seed=0, missing_rate=0.02):
+    """Пишет result.json с games_count играми по players_count игроков; возвращает имена игроков."""
+    rng = random.Random(seed)
+    player_names = [f"Игрок {i + 1}" for i in range(players_count)]
+    # Часть имен записана с ошибками, как в старых файлах, чтобы нагрузить сопоставление имен
+    spellings = {name: [name, name.lower(), name.replace(" ", "")] for name in player_names}
+    with open(json_file_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for game_number in range(1, games_count + 1):
+            players = [{"player_name": rng.choice(spellings[name]),
+                        "result": None if rng.random() < missing_rate else rng.randint(0, 200)}
+                       for name in player_names]
+            f.write(",\n" if game_number > 1 else "\n")
+            json.dump({"game_number": game_number, "image": f"sheet_{game_number:06d}.jpg", "players": players},
+                      f, ensure_ascii=False)
+        f.write("\n]\n")
+    return player_names
+
+
+def generate_images(directory, count, sizes=IMAGE_SIZES, formats=IMAGE_FORMATS, seed=0):
+    """Создает count изображений, похожих на сфотографированные листы; возвращает их пути."""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    file_paths = []
+    for i in range(count):
+        width, height = sizes[i % len(sizes)]
+        image_format, extension = formats[i % len(formats)]
+        # Шум нужен, чтобы размер сжатых файлов был близок к настоящим фотографиям
+        noise = rng.integers(200, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+        image = Image.fromarray(noise).resize((width, height), Image.BILINEAR)
+        draw = ImageDraw.Draw(image)
+        rows, columns = 12, 6
+        for row in range(rows + 1):
+            y = height * (row + 1) // (rows + 2)
+            draw.line((width // 20, y, width * 19 // 20, y), fill="black", width=max(1, width // 800))
+        for column in range(columns + 1):
+            x = width // 20 + (width * 9 // 10) * column // columns
+            draw.line((x, height // (rows + 2), x, height * (rows + 1) // (rows + 2)), fill="black",
+                      width=max(1, width // 800))
+        file_path = os.path.join(directory, f"sheet_{i:04d}{extension}")
+        image.save(file_path, image_format, quality=85)
+        file_paths.append(file_path)
+    return file_paths
+
+
+# Замеры
+
+def measure(function, repeat):
+    """Выполняет function repeat раз и возвращает время каждого запуска в секундах."""
+    runs = []
+    for run in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        function(run)
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def record(results, name, runs, items=None):
+    """Добавляет замер; items — число игр или изображений для времени на одну штуку."""
+    entry = {"name": name, "runs": [round(run, 6) for run in runs],
+             "median": round(statistics.median(runs), 6), "min": round(min(runs), 6)}
+    if items:
+        entry["items"] = items
+        entry["per_item"] = round(entry["median"] / items, 9)
+    results.append(entry)
+    print(f"{name:<32} {entry['median'] * 1000:10.1f} мс")
+
+
+def skip(results, name, reason):
+    results.append({"name": name, "skipped": reason})
+    print(f"{name:<32} пропущено: {reason}")
+
+
+def pump(root, condition, timeout=PUMP_TIMEOUT):
+    """Крутит цикл событий Tk, пока condition() не станет истинным."""
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("операция не завершилась за отведенное время")
+        root.update()
+        time.sleep(0.001)
+
+
+def run_headless(results, results_path, image_paths, repeat):
+    """Замеры вычислительной части без окон: то же, что делают страницы после нажатия кнопок."""
+    from exporters import write_csv, write_png
+    from image_viewer import decode_full
+    from incremental_stats import IncrementalStats
+    from name_resolver import NameResolver
+    from results_loader import GameReader
+    from score_store import ScoreStore
+    from thumbnail_loader import decode_thumbnail
+
+    games = list(GameReader(results_path))
+    record(results, "load_results", measure(lambda run: list(GameReader(results_path)), repeat), len(games))
+
+    def build(run):
+        store, stats, resolver = ScoreStore(), IncrementalStats(), NameResolver.from_players_file()
+        for game in games:
+            game = resolver.resolve_game(game)
+            store.append_game(game)
+            stats.add_game(game)
+        return store
+
+    record(results, "build_store", measure(build, repeat), len(games))
+    store = build(0)
+    record(results, "store_aggregates", measure(lambda run: (store._invalidate(), store.totals(), store.means(),
+                                                             store.stds()), repeat))
+    record(results, "write_csv", measure(lambda run: write_csv(store, "benchmark.csv"), repeat), len(games))
+    record(results, "write_png", measure(lambda run: write_png(store, "benchmark.png"), repeat), len(games))
+
+    if image_paths:
+        record(results, "decode_thumbnail", measure(lambda run: [decode_thumbnail(path) for path in image_paths],
+                                                    repeat), len(image_paths))
+        record(results, "decode_full", measure(lambda run: [decode_full(path, (1536, 864)) for path in image_paths],
+                                               repeat), len(image_paths))
+
+
+def run_results_page(results, results_path, repeat):
+    """Замеры ResultsPage в настоящем окне Tk."""
+    import tkinter as tk
+    from results_page import ResultsPage
+
+    root = tk.Tk()
+    root.geometry("1200x800")
+    page = None
+
+    def new_page():
+        nonlocal page
+        if page is not None:
+            page.go_back()
+        page = ResultsPage(root)
+        page.show()
+        root.update()
+        return page
+
+    def display_results(run):
+        new_page().display_results(results_path)
+        pump(root, lambda: page.games_iter is None)
+
+    record(results, "ResultsPage.display_results", measure(display_results, repeat))
+    record(results, "ResultsPage.load_json", measure(lambda run: page.load_json(results_path), repeat))
+
+    def save_to_csv(run):
+        page.save_to_csv()
+        pump(root, lambda: all(job.done for job in page.export_scheduler.jobs))
+
+    record(results, "ResultsPage.save_to_csv", measure(save_to_csv, repeat))
+
+    def plot_graph(run):
+        page.plot_graph()
+        root.update()
+        page.chart.canvas.draw()
+
+    record(results, "ResultsPage.plot_graph", measure(plot_graph, repeat))
+    page.go_back()
+    root.destroy()
+
+
+def run_main_window(results, image_paths, cache_directory, repeat):
+    """Замеры главного окна: добавление изображений до появления миниатюр и открытие просмотра."""
+    from main import ImageApp
+    from thumbnail_cache import ThumbnailCache
+    from thumbnail_loader import ThumbnailLoader
+
+    def new_app(run):
+        app = ImageApp()
+        app.update()
+        # Отдельный кэш на каждый запуск: замеряется холодное декодирование
+        app.thumbnail_loader = ThumbnailLoader(app, app.add_thumbnail, app.on_thumbnail_error, cache=ThumbnailCache(
+            os.path.join(cache_directory, f"thumbnails_{run}_{time.perf_counter_ns()}.sqlite")))
+        return app
+
+    def display_image(run):
+        app = new_app(run)
+        for file_path in image_paths:
+            app.display_image(file_path)
+        grid = app.image_grid
+        pump(app, lambda: grid.items and len(grid.photos) == len(grid.items))
+        app.on_close()
+
+    record(results, "main.display_image", measure(display_image, repeat), len(image_paths))
+
+    def open_large_image(run):
+        app = new_app(run)
+        for file_path in image_paths:
+            app.display_image(file_path)
+        app.update()
+        file_path = image_paths[0]
+        started = time.perf_counter()
+        app.open_large_image(file_path)
+        pump(app, lambda: app.viewer.cache.get(file_path, (None, False))[1])
+        elapsed = time.perf_counter() - started
+        app.viewer.close()
+        app.on_close()
+        return elapsed
+
+    # Время считается только от открытия просмотра, без создания окна и сетки
+    record(results, "main.open_large_image", [open_large_image(run) for run in range(repeat)])
+
+
+def start_virtual_display():
+    """Запускает Xvfb, если нет дисплея; возвращает процесс или None."""
+    if os.environ.get("DISPLAY") or shutil.which("Xvfb") is None:
+        return None
+    display = ":97"
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1920x1080x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def display_unavailable():
+    """Возвращает причину, по которой окна Tk создать нельзя, или None."""
+    import tkinter as tk
+
+    try:
+        tk.Tk().destroy()
+    except tk.TclError as e:
+        return f"нет дисплея ({e})"
+    return None
+
+
+def compare(baseline, current, tolerance=REGRESSION_TOLERANCE):
+    """Печатает отношение медиан к прошлому замеру; возвращает имена замедлившихся замеров."""
+    previous = {entry["name"]: entry for entry in baseline["results"] if "median" in entry}
+    regressions = []
+    print(f"\n{'Замер':<32} {'было, мс':>10} {'стало, мс':>10} {'x':>6}")
+    for entry in current["results"]:
+        old = previous.get(entry["name"])
+        if old is None or "median" not in entry:
+            continue
+        ratio = entry["median"] / max(old["median"], 1e-9)
+        marker = " <- медленнее" if ratio > 1 + tolerance else ""
+        print(f"{entry['name']:<32} {old['median'] * 1000:10.1f} {entry['median'] * 1000:10.1f} {ratio:6.2f}{marker}")
+        if marker:
+            regressions.append(entry["name"])
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических данных")
+    parser.add_argument("--games", type=int, default=20000, help="число игр в result.json")
+    parser.add_argument("--players", type=int, default=6, help="игроков в каждой игре")
+    parser.add_argument("--images", type=int, default=30, help="число синтетических фотографий")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов каждого замера")
+    parser.add_argument("--output", default="benchmark.json", help="куда записать результаты")
+    parser.add_argument("--compare", help="прошлый файл результатов для сравнения")
+    parser.add_argument("--xvfb", action="store_true", help="запустить виртуальный дисплей Xvfb, если нет своего")
+    parser.add_argument("--headless", action="store_true", help="не создавать окна Tk")
+    args = parser.parse_args(argv)
+
+    output_path = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    display_process = start_virtual_display() if args.xvfb else None
+    results = []
+    working_directory = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="interface_benchmark_") as directory:
+            # Страницы пишут CSV и читают players.json из текущей папки
+            os.chdir(directory)
+            started = time.perf_counter()
+            player_names = generate_results("result.json", args.games, args.players)
+            save_player_names(player_names)
+            image_paths = generate_images("images", args.images)
+            print(f"Данные созданы за {time.perf_counter() - started:.1f} с\n")
+
+            run_headless(results, "result.json", image_paths, args.repeat)
+
+            reason = "запуск с --headless" if args.headless else display_unavailable()
+            if reason is None:
+                run_results_page(results, os.path.abspath("result.json"), args.repeat)
+            else:
+                for name in ("display_results", "load_json", "save_to_csv", "plot_graph"):
+                    skip(results, f"ResultsPage.{name}", reason)
+
+            if reason is None:
+                try:
+                    import tkinterdnd2  # noqa: F401  главное окно без него не создается
+                except ImportError as e:
+                    reason = f"не установлен tkinterdnd2 ({e})"
+            if reason is None and image_paths:
+                run_main_window(results, image_paths, directory, args.repeat)
+            else:
+                for name in ("display_image", "open_large_image"):
+                    skip(results, f"main.{name}", reason or "нет изображений")
+    finally:
+        os.chdir(working_directory)
+        if display_process is not None:
+            display_process.terminate()
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {"games": args.games, "players": args.players, "images": args.images, "repeat": args.repeat},
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты записаны в {output_path}")
+
+    if baseline is not None and compare(baseline, report):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import tkinter as tk
+
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+from instrumentation import span
+
+MARKER_LIMIT = 50  # маркеры рисуются только на коротких рядах
+
+
+def decimate_min_max(x, y, buckets):
+    """Прореживает ряд до 2 * buckets точек, сохраняя минимум и максимум каждой корзины.
+
+    На экране прореженный ряд выглядит так же, как исходный, потому что в
+    каждый столбец пикселей попадает вся амплитуда значений.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) <= buckets * 2:
+        return x, y
+
+    starts = np.linspace(0, len(y), buckets, endpoint=False).astype(np.int64)
+    lengths = np.diff(np.append(starts, len(y)))
+    # Позиции минимума и максимума в каждой корзине, без цикла по корзинам
+    bucket_of = np.repeat(np.arange(buckets), lengths)
+    order = np.lexsort((y, bucket_of))
+    min_index = order[starts]
+    max_index = order[starts + lengths - 1]
+    index = np.sort(np.concatenate((min_index, max_index)))
+    return x[index], y[index]
+
+
+class ChartPanel(tk.Frame):
+    """График результатов внутри окна с переключением игроков без полной перерисовки."""
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.figure = Figure(figsize=(8, 3.5))
+        self.axes = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.toggles_frame = tk.Frame(self)
+        self.toggles_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5)
+
+        self.series = {}  # имя игрока -> (номера игр, очки); срезы буферов self.buffers
+        self.buffers = {}  # имя игрока -> (x, y) с запасом места под новые игры
+        self.decimated = {}  # имя игрока -> [прореженные x, y, сколько точек ряда в них, точек на корзину]
+        self.extent = None  # (x_min, x_max, y_min, y_max) всех рядов
+        self.lines = {}  # имя игрока -> Line2D
+        self.visible = {}  # имя игрока -> tk.BooleanVar
+        self.background = None
+        self.decimated_width = 0
+
+        self.axes.set_xlabel("Номер игры")
+        self.axes.set_ylabel("Баллы")
+        self.axes.set_title("Результативность игроков")
+        self.axes.grid(True)
+
+        # После каждой полной отрисовки (в том числе при изменении размера) сохраняем фон для blit
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def set_data(self, series):
+        """Задает ряды {имя: (x, y)} и один раз полностью перерисовывает график."""
+        for line in self.lines.values():
+            line.remove()
+        for widget in self.toggles_frame.winfo_children():
+            widget.destroy()
+        self.series = {}
+        self.buffers = {}
+        self.lines = {}
+        self.visible = {}
+
+        for player_name, (x, y) in series.items():
+            self._set_buffer(player_name, np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+            marker = "o" if len(y) <= MARKER_LIMIT else None
+            # animated: линии не входят в фон и рисуются поверх него через blit
+            line, = self.axes.plot([], [], label=player_name, marker=marker, animated=True)
+            self.lines[player_name] = line
+
+            variable = tk.BooleanVar(value=True)
+            self.visible[player_name] = variable
+            tk.Checkbutton(self.toggles_frame, text=player_name, variable=variable, fg=line.get_color(),
+                           anchor="w", command=lambda name=player_name: self.toggle(name)).pack(fill=tk.X)
+
+        x_values = [x for x, _ in self.series.values() if len(x)]
+        y_values = [y for _, y in self.series.values() if len(y)]
+        self.extent = (min(x.min() for x in x_values), max(x.max() for x in x_values),
+                       min(y.min() for y in y_values), max(y.max() for y in y_values)) if x_values else None
+
+        self._decimate()
+        self._rescale()
+        self.canvas.draw_idle()
+
+    def _set_buffer(self, player_name, x, y, count=None):
+        """Запоминает буферы ряда и делает self.series[player_name] срезом их заполненной части."""
+        count = len(y) if count is None else count
+        self.buffers[player_name] = (x, y)
+        self.series[player_name] = (x[:count], y[:count])
+
+    def toggle(self, player_name):
+        """Показывает или скрывает игрока, перерисовывая только линии поверх сохраненного фона."""
+        self.lines[player_name].set_visible(self.visible[player_name].get())
+        self._blit()
+
+    def _pixel_width(self):
+        return max(int(self.axes.bbox.width), 100)
+
+    def _decimate(self):
+        self.decimated_width = self._pixel_width()
+        for player_name in self.series:
+            self._decimate_series(player_name)
+
+    def _decimate_series(self, player_name):
+        """Прореживает весь ряд игрока и запоминает размер корзины для дописываемых точек."""
+        x, y = self.series[player_name]
+        decimated_x, decimated_y = decimate_min_max(x, y, self.decimated_width)
+        points_per_bucket = max(1, -(-len(y) // self.decimated_width)) if len(decimated_y) < len(y) else 1
+        self.decimated[player_name] = [decimated_x, decimated_y, len(y), points_per_bucket]
+        self.lines[player_name].set_data(decimated_x, decimated_y)
+
+    def _rescale(self):
+        if self.extent is None:
+            return
+        x_min, x_max, y_min, y_max = self.extent
+        y_margin = max((y_max - y_min) * 0.05, 1)
+        self.axes.set_xlim(x_min, max(x_max, x_min + 1))
+        self.axes.set_ylim(y_min - y_margin, y_max + y_margin)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.axes.bbox)
+        if abs(self._pixel_width() - self.decimated_width) > 50:
+            # Размер заметно изменился: пересчитываем прореживание под новую ширину
+            self._decimate()
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self.lines.values():
+            if line.get_visible():
+                self.axes.draw_artist(line)
+
+    def _blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        with span("plot", "ChartPanel.blit"):
+            self.canvas.restore_region(self.background)
+            self._draw_lines()
+            self.canvas.blit(self.axes.bbox)
+
+    def append_point(self, player_name, x, y):
+        """Дописывает точку в ряд игрока, перерисовывая только линии, если оси не меняются.
+
+        Стоимость не зависит от длины истории: ряд лежит в буфере с запасом,
+        а прореживается только последняя, еще не заполненная корзина. Когда
+        прореженных точек становится вдвое больше нужного, ряд прореживается
+        заново целиком, то есть не чаще чем при каждом удвоении истории.
+        """
+        if player_name not in self.lines:
+            # Новый игрок: нужна полная перестройка линий и переключателей
+            series = dict(self.series)
+            series[player_name] = (np.array([x], dtype=np.float64), np.array([y], dtype=np.float64))
+            self.set_data(series)
+            return
+
+        buffer_x, buffer_y = self.buffers[player_name]
+        count = len(self.series[player_name][1])
+        if count == len(buffer_y):
+            buffer_x = np.concatenate((buffer_x, np.empty(max(count, 16))))
+            buffer_y = np.concatenate((buffer_y, np.empty(max(count, 16))))
+        buffer_x[count], buffer_y[count] = x, y
+        self._set_buffer(player_name, buffer_x, buffer_y, count + 1)
+        x_min, x_max, y_min, y_max = self.extent or (x, x, y, y)
+        self.extent = (min(x_min, x), max(x_max, x), min(y_min, y), max(y_max, y))
+
+        decimated = self.decimated[player_name]
+        decimated_x, decimated_y, done, points_per_bucket = decimated
+        if count + 1 - done >= points_per_bucket:
+            # Корзина заполнилась: от нее остаются минимум и максимум
+            tail_x, tail_y = buffer_x[done:count + 1], buffer_y[done:count + 1]
+            if len(tail_y) > 2:
+                index = sorted((int(np.argmin(tail_y)), int(np.argmax(tail_y))))
+                tail_x, tail_y = tail_x[index], tail_y[index]
+            decimated[:3] = np.concatenate((decimated_x, tail_x)), np.concatenate((decimated_y, tail_y)), count + 1
+            if len(decimated[1]) > 4 * self.decimated_width:
+                self._decimate_series(player_name)
+        decimated_x, decimated_y, done, _ = self.decimated[player_name]
+        self.lines[player_name].set_data(np.concatenate((decimated_x, buffer_x[done:count + 1])),
+                                         np.concatenate((decimated_y, buffer_y[done:count + 1])))
+
+        x_min, x_max = self.axes.get_xlim()
+        y_min, y_max = self.axes.get_ylim()
+        if x_min <= x <= x_max and y_min <= y <= y_max:
+            self._blit()
+        else:
+            self._rescale()
+            self.canvas.draw_idle()
@@ -0,0 +1,264 @@
+import hashlib
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from instrumentation import get_logger, span
+
+logger = get_logger("duplicate_index")
+
+HASH_BITS = 512
+CELL_GRID = 6  # запись в каждой клетке сводится к карте яркости 6x6
+# Подобрано на синтетических листах бланков 7x6, 5x8 и 9x12, где все клетки заполнены
+# случайными очками, а колонка имен одинаковая: повторные снимки того же листа (поворот
+# до 3 градусов, масштаб, размытие, JPEG) расходились не больше чем на 84 бита, разные игры
+# не меньше чем на 136. На настоящих фотографиях порог стоит перепроверить.
+NEAR_DUPLICATE_DISTANCE = 104
+HASH_WORK_SIDE = 1200  # размер, до которого уменьшается фото перед поиском сетки
+
+
+def content_hash(file_path, block_size=1024 * 1024):
+    """Хеш содержимого файла: совпадает только у побайтно одинаковых файлов."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cell_shape(darkness, ink, grid=CELL_GRID):
+    """Форма записи в клетке: яркость внутри рамки чернил, сведенная к grid x grid.
+
+    Рамка по чернилам делает описание независимым от того, где в клетке
+    написано число, а нулевое среднее и единичная норма уравнивают вклад
+    клеток. Пустая клетка дает нули.
+    """
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 4:
+        return np.zeros(grid * grid, dtype=np.float32)
+    crop = darkness[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+    shape = np.asarray(Image.fromarray(crop, "F").resize((grid, grid), Image.BOX), dtype=np.float32).ravel()
+    shape = shape - shape.mean()
+    norm = np.linalg.norm(shape)
+    return shape / norm if norm > 0 else shape
+
+
+@lru_cache(maxsize=16)
+def _hyperplanes(dimensions, bits=HASH_BITS):
+    """Случайные, но одинаковые при каждом запуске плоскости для SimHash вектора такой длины."""
+    return np.random.default_rng(dimensions).standard_normal((bits, dimensions)).astype(np.float32)
+
+
+def sheet_hash(image, bits=HASH_BITS):
+    """Перцептивный хеш записей на листе в виде int из bits бит.
+
+    У всех листов одного бланка сетка, заголовки и заполненные клетки на
+    одних местах, поэтому карта заполненности почти не различает разные
+    игры. Здесь лист разбивается на клетки по линиям сетки, для каждой клетки
+    берется форма записанного в ней (_cell_shape), а из всех форм строится
+    SimHash: расстояние Хэмминга растет с углом между векторами, то есть
+    с тем, насколько различаются записи, а не то, где они стоят.
+    """
+    from recognition import binarize, deskew, segment_cells, to_gray
+
+    gray = deskew(to_gray(image, HASH_WORK_SIDE))
+    ink = binarize(gray)
+    darkness = 255 - gray.astype(np.float32)
+    row_bands, column_bands = segment_cells(ink)
+    if row_bands and column_bands:
+        shapes = []
+        for top, bottom in row_bands:
+            for left, right in column_bands:
+                # Поля клетки отрезаются, чтобы в запись не попали остатки линий
+                margin_y, margin_x = max(1, (bottom - top) // 10), max(1, (right - left) // 20)
+                cell = np.s_[top + margin_y:bottom - margin_y, left + margin_x:right - margin_x]
+                shapes.append(_cell_shape(darkness[cell], ink[cell]))
+        features = np.concatenate(shapes)
+    else:
+        # Сетка не найдена: весь кадр как одна крупная клетка
+        features = _cell_shape(darkness, ink, grid=CELL_GRID * 4)
+
+    hash_bits = _hyperplanes(features.size, bits) @ features > 0
+    return int.from_bytes(np.packbits(hash_bits).tobytes(), "big")
+
+
+def hash_file(file_path):
+    """Возвращает (хеш содержимого, хеш записей на листе) файла."""
+    with Image.open(file_path) as image:
+        return content_hash(file_path), sheet_hash(image)
+
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    _BIT_COUNTS = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return _BIT_COUNTS[words.view(np.uint8)].reshape(*words.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+class HammingIndex:
+    """Поиск хешей, отличающихся не более чем на max_distance бит.
+
+    Хеши хранятся строками массива uint64, и расстояние до всех сразу
+    считается одной векторной операцией. В отличие от BK-дерева и поиска по
+    кускам хеша, время не растет от того, что хеши листов одного бланка
+    похожи друг на друга: десятки тысяч хешей проверяются меньше чем за миллисекунду.
+    """
+
+    def __init__(self, max_distance, hash_bits=HASH_BITS, capacity=1024):
+        self.max_distance = max_distance
+        self.words = -(-hash_bits // 64)
+        # По отдельному непрерывному массиву на каждое 64-битное слово: так проход по памяти самый короткий
+        self.columns = np.empty((self.words, capacity), dtype=np.uint64)
+        self.values = []
+
+    @property
+    def size(self):
+        return len(self.values)
+
+    def _split(self, key):
+        return [np.uint64((key >> (64 * i)) & 0xFFFFFFFFFFFFFFFF) for i in range(self.words)]
+
+    def add(self, key, value):
+        if self.size == self.columns.shape[1]:
+            columns = np.empty((self.words, self.size * 2), dtype=np.uint64)
+            columns[:, :self.size] = self.columns
+            self.columns = columns
+        self.columns[:, self.size] = self._split(key)
+        self.values.append(value)
+
+    def remove(self, value):
+        """Удаляет хеш значения value: на его место переносится последний."""
+        index = self.values.index(value)
+        last = self.size - 1
+        self.columns[:, index] = self.columns[:, last]
+        self.values[index] = self.values[last]
+        self.values.pop()
+
+    def find(self, key):
+        """Возвращает [(расстояние, значение), ...] для всех хешей не дальше max_distance."""
+        if not self.values:
+            return []
+        distances = np.zeros(self.size, dtype=np.uint16)
+        for column, word in zip(self.columns[:, :self.size], self._split(key)):
+            distances += _popcount(column ^ word)
+        matches = np.nonzero(distances <= self.max_distance)[0]
+        return sorted((int(distances[i]), self.values[i]) for i in matches)
+
+
+class DuplicateIndex:
+    """Индекс добавленных фотографий для поиска точных и почти точных повторов."""
+
+    def __init__(self, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.max_distance = max_distance
+        self.by_content = {}  # хеш содержимого -> первый путь
+        self.digests = {}  # путь в индексе -> хеш содержимого
+        self.hashes = HammingIndex(max_distance)
+        self.duplicates = {}  # путь -> (вид повтора, путь оригинала)
+
+    def add(self, file_path, digest, phash):
+        """Добавляет файл; возвращает (вид, оригинал), если это повтор, иначе None.
+
+        Вид — "exact" для побайтно одинаковых файлов и "near" для похожих
+        снимков. Похожий снимок может оказаться другой игрой, поэтому он
+        остается в индексе наравне с остальными и только помечается.
+        """
+        original = self.by_content.get(digest)
+        if original is not None:
+            self.duplicates[file_path] = ("exact", original)
+            return self.duplicates[file_path]
+
+        matches = self.hashes.find(phash)
+        self.by_content[digest] = file_path
+        self.digests[file_path] = digest
+        self.hashes.add(phash, file_path)
+        if matches:
+            self.duplicates[file_path] = ("near", matches[0][1])
+            return self.duplicates[file_path]
+        return None
+
+    def remove(self, file_path):
+        """Убирает файл из индекса, например перед повторной проверкой измененного файла.
+
+        Возвращает побайтные копии этого файла: они больше не считаются
+        повторами и должны быть проверены заново.
+        """
+        self.duplicates.pop(file_path, None)
+        digest = self.digests.pop(file_path, None)
+        if digest is None:
+            return []
+        del self.by_content[digest]
+        self.hashes.remove(file_path)
+        copies = [path for path, (kind, original) in self.duplicates.items()
+                  if kind == "exact" and original == file_path]
+        for path in copies:
+            del self.duplicates[path]
+        return copies
+
+    def is_exact_duplicate(self, file_path):
+        return self.duplicates.get(file_path, ("",))[0] == "exact"
+
+    def near_duplicates(self, file_paths):
+        """Пути из file_paths, похожие на ранее добавленные снимки."""
+        return [path for path in file_paths if self.duplicates.get(path, ("",))[0] == "near"]
+
+
+class DuplicateChecker:
+    """Считает хеши в пуле потоков и проверяет их по индексу в потоке Tk через after().
+
+    Индекс меняется только в главном потоке, поэтому порядок "кто оригинал"
+    определяется порядком завершения хеширования, а блокировки не нужны.
+    """
+
+    def __init__(self, widget, on_duplicate, index=None, max_workers=None, poll_interval=50):
+        self.widget = widget
+        self.on_duplicate = on_duplicate
+        self.index = index or DuplicateIndex()
+        self.poll_interval = poll_interval
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1))
+        self.results = queue.Queue()
+        self.pending = 0
+        self.poll_id = None
+
+    def submit(self, file_path):
+        self.pending += 1
+        self.executor.submit(self._hash, file_path)
+        if self.poll_id is None:
+            self.poll_id = self.widget.after(self.poll_interval, self._drain)
+
+    def _hash(self, file_path):
+        try:
+            with span("decode", "hash_file"):
+                self.results.put((file_path, *hash_file(file_path)))
+        except Exception as e:
+            logger.warning("Не удалось вычислить хеш '%s': %s", file_path, e)
+            self.results.put((file_path, None, None))
+
+    def _drain(self):
+        self.poll_id = None
+        while True:
+            try:
+                file_path, digest, phash = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if digest is None:
+                continue
+            duplicate = self.index.add(file_path, digest, phash)
+            if duplicate is not None:
+                self.on_duplicate(file_path, *duplicate)
+
+        if self.pending > 0:
+            self.poll_id = self.widget.after(self.poll_interval, self._drain)
+
+    def shutdown(self):
+        if self.poll_id is not None:
+            self.widget.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
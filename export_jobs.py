@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import get_logger, span
+
+logger = get_logger("export")
+
+
+class ExportCancelled(Exception):
+    """Экспорт остановлен пользователем."""
+
+
+class ExportJob:
+    """Одна фоновая задача экспорта с прогрессом и возможностью отмены."""
+
+    def __init__(self, name, file_path):
+        self.name = name
+        self.file_path = file_path
+        self.progress = 0.0
+        self.state = "ожидание"
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def report(self, progress):
+        """Вызывается экспортером из рабочего потока; прерывает работу при отмене."""
+        if self.cancel_event.is_set():
+            raise ExportCancelled()
+        self.progress = progress
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self.state = "отменено"
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class ExportScheduler:
+    """Запускает экспорт в пуле потоков и сообщает о ходе работы в поток Tk через after()."""
+
+    def __init__(self, widget, on_update, max_workers=3, poll_interval=100):
+        self.widget = widget
+        self.on_update = on_update
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs = []
+        self.poll_id = None
+
+    def submit(self, name, export_function, store, file_path):
+        """Ставит экспорт в очередь. store должен быть снимком, который больше не меняется."""
+        job = ExportJob(name, file_path)
+        job.future = self.executor.submit(self._run, job, export_function, store)
+        self.jobs.append(job)
+        self.on_update(job)
+        if self.poll_id is None:
+            self.poll_id = self.widget.after(self.poll_interval, self._poll)
+        return job
+
+    def _run(self, job, export_function, store):
+        job.state = "выполняется"
+        try:
+            with span("export", job.name, path=job.file_path, games=store.games_count):
+                export_function(store, job.file_path, progress=job.report)
+            job.progress = 1.0
+            job.state = "готово"
+        except ExportCancelled:
+            job.state = "отменено"
+        except Exception as e:
+            logger.exception("Экспорт %s не выполнен", job.name)
+            job.error = e
+            job.state = "ошибка"
+
+    def _poll(self):
+        self.poll_id = None
+        for job in list(self.jobs):
+            self.on_update(job)
+            if job.done:
+                self.jobs.remove(job)
+        if self.jobs:
+            self.poll_id = self.widget.after(self.poll_interval, self._poll)
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        if self.poll_id is not None:
+            self.widget.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
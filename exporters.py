@@ -0,0 +1,179 @@
+import csv
+import math
+import os
+import threading
+from contextlib import contextmanager, suppress
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side, numbers
+
+from chart import MARKER_LIMIT, decimate_min_max
+from score_store import format_player_scores, format_score
+
+PROGRESS_STEP = 1000  # как часто (в играх) сообщать о прогрессе
+PNG_DPI = 100
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill("solid", fgColor="4F81BD")
+HEADER_BORDER = Border(bottom=Side(style="thin", color="000000"))
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+
+def _no_progress(fraction):
+    pass
+
+
+def _report_every(store, progress, share=1.0):
+    """Генератор номеров игр, сообщающий прогресс каждые PROGRESS_STEP игр."""
+    total = max(store.games_count, 1)
+    for index in range(store.games_count):
+        if index % PROGRESS_STEP == 0:
+            progress(share * index / total)
+        yield index
+
+
+@contextmanager
+def _replace_on_success(file_path):
+    """Дает временный путь рядом с file_path и переносит файл на место, только если запись завершилась.
+
+    При отмене или ошибке временный файл удаляется, а прежний файл остается
+    нетронутым, поэтому недописанный экспорт никогда не оказывается по итоговому пути.
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    stem, extension = os.path.splitext(name)
+    # Расширение сохраняется: по нему openpyxl и matplotlib выбирают формат
+    temporary_path = os.path.join(directory, f".{stem}.{threading.get_ident()}.tmp{extension}")
+    try:
+        yield temporary_path
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(temporary_path)
+        raise
+
+
+def _header_row(sheet, titles):
+    row = []
+    for title in titles:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        row.append(cell)
+    return row
+
+
+def _number_cell(sheet, value, number_format):
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.number_format = number_format
+    return cell
+
+
+def _game_rows(store, columns_count, progress):
+    """Строки листа игр генерируются по одной, вся таблица в памяти не строится."""
+    for index, (game_number, player_ids, scores) in zip(_report_every(store, progress, 0.95), store.iter_game_rows()):
+        row = [game_number] + [None] * columns_count
+        for player_id, score in zip(player_ids, scores):
+            row[player_id + 1] = format_score(score)
+        yield row
+
+
+def write_csv(store, csv_file_path, progress=_no_progress):
+    """Сохраняет игры и итоги по игрокам в CSV-файл."""
+    with _replace_on_success(csv_file_path) as temporary_path, \
+            open(temporary_path, "w", newline="", encoding="utf-8") as csvfile:
+        csvwriter = csv.writer(csvfile)
+
+        # Заголовок таблицы 1: Результаты игр
+        csvwriter.writerow(["Номер игры", "Очки игроков"])
+        for index in _report_every(store, progress, 0.95):
+            game_number, players = store.game(index)
+            csvwriter.writerow([game_number, format_player_scores(players)])
+
+        # Пустая строка для разделения листов
+        csvwriter.writerow([])
+
+        # Заголовок таблицы 2: Общий счет и Среднее значение каждого игрока
+        csvwriter.writerow(["Игрок", "Общий счет", "Среднее значение"])
+        totals, counts, means = store.totals(), store.counts(), store.means()
+        for player_id, player_name in enumerate(store.names):
+            if counts[player_id]:
+                csvwriter.writerow([player_name, format_score(totals[player_id]), round(float(means[player_id]), 2)])
+    progress(1.0)
+
+
+def write_excel(store, xlsx_file_path, progress=_no_progress):
+    """Сохраняет результаты в XLSX в потоковом (write-only) режиме openpyxl."""
+    workbook = Workbook(write_only=True)
+
+    # Лист 1: игры, по колонке на игрока
+    games_sheet = workbook.create_sheet("Игры")
+    games_sheet.freeze_panes = "B2"
+    games_sheet.column_dimensions["A"].width = 12
+    games_sheet.append(_header_row(games_sheet, ["Номер игры"] + store.names))
+    for row in _game_rows(store, len(store.names), progress):
+        games_sheet.append(row)
+
+    # Лист 2: итоги и средние по игрокам
+    totals_sheet = workbook.create_sheet("Итоги")
+    totals_sheet.freeze_panes = "A2"
+    totals_sheet.column_dimensions["A"].width = 24
+    totals_sheet.append(_header_row(
+        totals_sheet, ["Игрок", "Игр", "Общий счет", "Среднее значение", "Ст. отклонение", "Минимум", "Максимум"]))
+
+    counts, totals, means, stds = store.counts(), store.totals(), store.means(), store.stds()
+    mins, maxs = store.mins(), store.maxs()
+    for player_id, player_name in enumerate(store.names):
+        if not counts[player_id]:
+            continue
+        totals_sheet.append([
+            player_name,
+            int(counts[player_id]),
+            format_score(float(totals[player_id])),
+            _number_cell(totals_sheet, round(float(means[player_id]), 2), numbers.FORMAT_NUMBER_00),
+            _number_cell(totals_sheet, round(float(stds[player_id]), 2), numbers.FORMAT_NUMBER_00),
+            format_score(float(mins[player_id])) if math.isfinite(mins[player_id]) else None,
+            format_score(float(maxs[player_id])) if math.isfinite(maxs[player_id]) else None,
+        ])
+
+    progress(0.95)
+    with _replace_on_success(xlsx_file_path) as temporary_path:
+        workbook.save(temporary_path)
+    progress(1.0)
+
+
+def write_png(store, png_file_path, progress=_no_progress):
+    """Строит график результатов и сохраняет его в .png.
+
+    Используется объектный API matplotlib без pyplot, поэтому функцию можно
+    вызывать из рабочего потока.
+    """
+    figure = Figure(figsize=(10, 6), dpi=PNG_DPI)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+
+    # Длинные ряды прореживаются до ширины картинки в пикселях
+    pixel_width = int(figure.get_figwidth() * PNG_DPI)
+    players_count = max(len(store.names), 1)
+    for player_id, player_name in enumerate(store.names):
+        progress(0.8 * player_id / players_count)
+        game_index, scores = store.series(player_id)
+        if len(scores):
+            marker = 'o' if len(scores) <= MARKER_LIMIT else None
+            axes.plot(*decimate_min_max(game_index + 1, scores, pixel_width), label=player_name, marker=marker)
+
+    # Настройки графика
+    axes.set_xlabel("Номер игры")
+    axes.set_ylabel("Баллы")
+    axes.set_title("Результативность игроков")
+    axes.legend()
+    axes.grid(True)
+
+    progress(0.8)
+    with _replace_on_success(png_file_path) as temporary_path:
+        figure.savefig(temporary_path, dpi=PNG_DPI)
+    progress(1.0)
@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Форматы, которые открывает Pillow без дополнительных плагинов
+SUPPORTED_TYPES = ("jpeg", "png", "gif", "bmp", "webp", "tiff")
+
+
+def sniff_image_type(file_path):
+    """Определяет формат по сигнатуре в начале файла, а не по расширению."""
+    with open(file_path, "rb") as f:
+        header = f.read(16)
+
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header.startswith(b"BM"):
+        return "bmp"
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return "webp"
+    if header.startswith((b"II*\x00", b"MM\x00*")):
+        return "tiff"
+    if header[4:8] == b"ftyp" and header[8:12] in (b"heic", b"heix", b"hevc", b"mif1", b"msf1"):
+        return "heic"
+    return None
+
+
+class FolderScanner:
+    """Параллельно обходит папки через os.scandir и потоково отдает найденные изображения.
+
+    Каждая папка сканируется отдельной задачей пула, вложенные папки ставятся
+    в очередь по мере обнаружения. Результаты забираются потоком Tk через drain().
+    """
+
+    def __init__(self, max_workers=8):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.cancel_event = threading.Event()
+        self.images_found = 0
+        self.skipped = []  # (путь, причина)
+
+    def scan(self, paths):
+        """Запускает обход; пути могут быть как файлами, так и папками."""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                self._submit(self._scan_directory, path)
+            else:
+                files.append(path)
+        if files:
+            self._submit(self._check_files, files)
+
+    @property
+    def done(self):
+        with self.lock:
+            return self.pending == 0
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def drain(self, limit=None):
+        """Возвращает найденные изображения (не больше limit за раз)."""
+        file_paths = []
+        while limit is None or len(file_paths) < limit:
+            try:
+                file_paths.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        return file_paths
+
+    def _submit(self, function, argument):
+        with self.lock:
+            self.pending += 1
+        self.executor.submit(self._run, function, argument)
+
+    def _run(self, function, argument):
+        try:
+            if not self.cancel_event.is_set():
+                function(argument)
+        except OSError as e:
+            self.skipped.append((str(argument), str(e)))
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def _scan_directory(self, directory):
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    self._submit(self._scan_directory, entry.path)
+                elif entry.is_file():
+                    files.append(entry.path)
+        self._check_files(sorted(files))
+
+    def _check_files(self, file_paths):
+        for file_path in file_paths:
+            if self.cancel_event.is_set():
+                return
+            try:
+                image_type = sniff_image_type(file_path)
+            except OSError as e:
+                self.skipped.append((file_path, str(e)))
+                continue
+            if image_type in SUPPORTED_TYPES:
+                with self.lock:
+                    self.images_found += 1
+                self.results.put(file_path)
+            elif image_type is not None:
+                self.skipped.append((file_path, f"формат {image_type} не поддерживается"))
+            else:
+                self.skipped.append((file_path, "не является изображением"))
@@ -0,0 +1,215 @@
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+
+from instrumentation import get_logger
+
+logger = get_logger("folder_watcher")
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+MANIFEST_NAME = ".interface_manifest.json"
+
+# Константы inotify из <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_IGNORED = 0x00008000  # наблюдение снято: папка удалена или отмонтирована
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Минимальная обертка над inotify через ctypes (только Linux)."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, "inotify_add_watch")
+
+    def read(self, timeout):
+        """Возвращает имена файлов, для которых пришли события за timeout секунд.
+
+        Если сама папка пропала, выбрасывает FileNotFoundError.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            if mask & IN_IGNORED:
+                raise FileNotFoundError(errno.ENOENT, "Папка больше недоступна")
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Следит за папкой и отдает новые или измененные изображения, когда их запись завершена.
+
+    Файл считается готовым, если его размер и время изменения не менялись
+    settle_time секунд. В манифест в самой папке файл записывается, только
+    когда окно подтвердит прием через mark_handled(): файлы, не забранные до
+    остановки или закрытия, после перезапуска будут отданы снова.
+
+    Если папка стала недоступна (удалена, отключен диск, нет прав на чтение),
+    наблюдение останавливается, а ошибка сохраняется в error.
+    """
+
+    def __init__(self, directory, settle_time=1.0, poll_interval=2.0):
+        self.directory = os.path.abspath(directory)
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        self.settled = {}  # имя -> [размер, время изменения]: отдан окну, но прием еще не подтвержден
+        self.lock = threading.Lock()  # manifest и settled общие для потока наблюдения и потока Tk
+
+        self.ready = queue.Queue()  # готовые пути, забираются потоком Tk
+        self.candidates = {}  # путь -> (размер, время изменения, когда замечено последнее изменение)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None  # OSError, остановившая наблюдение
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        temporary_path = self.manifest_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temporary_path, self.manifest_path)
+
+    def mark_handled(self, file_paths):
+        """Записывает в манифест файлы, переданные окну (вызывается из потока Tk после add_paths)."""
+        with self.lock:
+            for file_path in file_paths:
+                name = os.path.basename(file_path)
+                signature = self.settled.pop(name, None)
+                if signature is not None:
+                    self.manifest[name] = signature
+            manifest = dict(self.manifest)
+        try:
+            self._save_manifest(manifest)
+        except OSError as e:
+            # Без манифеста файлы будут отданы повторно после перезапуска, но не потеряются
+            logger.warning("Не удалось сохранить манифест '%s': %s", self.manifest_path, e)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                inotify = Inotify(self.directory)
+            except OSError as e:
+                logger.warning("inotify недоступен, используется опрос папки: %s", e)
+
+        try:
+            # Первый проход находит файлы, появившиеся, пока приложение было закрыто
+            self._scan()
+            last_scan = time.monotonic()
+            while not self.stop_event.is_set():
+                if inotify is not None:
+                    for name in inotify.read(timeout=min(self.settle_time, 0.5)):
+                        self._touch(os.path.join(self.directory, name))
+                else:
+                    self.stop_event.wait(min(self.settle_time, self.poll_interval))
+                    if time.monotonic() - last_scan >= self.poll_interval:
+                        self._scan()
+                        last_scan = time.monotonic()
+                self._collect_settled()
+        except OSError as e:
+            logger.exception("Наблюдение за папкой '%s' остановлено", self.directory)
+            self.error = e
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _scan(self):
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    self._touch(entry.path)
+
+    def _touch(self, file_path):
+        """Запоминает файл как кандидата, если он новый или изменился с прошлой обработки."""
+        if not file_path.lower().endswith(IMAGE_EXTENSIONS):
+            return
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            self.candidates.pop(file_path, None)
+            return
+
+        signature = [stat.st_size, stat.st_mtime_ns]
+        name = os.path.basename(file_path)
+        with self.lock:
+            if signature in (self.manifest.get(name), self.settled.get(name)):
+                return
+        previous = self.candidates.get(file_path)
+        if previous is None or previous[:2] != tuple(signature):
+            self.candidates[file_path] = (stat.st_size, stat.st_mtime_ns, time.monotonic())
+
+    def _collect_settled(self):
+        """Отдает файлы, которые не менялись settle_time секунд."""
+        now = time.monotonic()
+        settled = []
+        for file_path, (size, mtime_ns, changed_at) in list(self.candidates.items()):
+            if now - changed_at < self.settle_time:
+                continue
+            # Перепроверяем: файл мог продолжать расти без событий (например, по сети)
+            self._touch(file_path)
+            current = self.candidates.get(file_path)
+            if current is not None and current[2] == changed_at:
+                settled.append(file_path)
+                del self.candidates[file_path]
+                with self.lock:
+                    self.settled[os.path.basename(file_path)] = [size, mtime_ns]
+
+        for file_path in sorted(settled):
+            self.ready.put(file_path)
+
+    def drain(self):
+        """Возвращает все готовые файлы (вызывается из потока Tk)."""
+        file_paths = []
+        while True:
+            try:
+                file_paths.append(self.ready.get_nowait())
+            except queue.Empty:
+                return file_paths
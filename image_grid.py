@@ -0,0 +1,198 @@
+import tkinter as tk
+
+from instrumentation import span
+
+THUMBNAIL_WIDTH = 200
+THUMBNAIL_HEIGHT = 150
+
+
+class ImageGrid(tk.Frame):
+    """Прокручиваемая сетка миниатюр, которая держит в памяти только видимые строки."""
+
+    def __init__(self, parent, request_thumbnail, on_click, cell_width, cell_height, prefetch_rows=2,
+                 reflow_delay=100, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.request_thumbnail = request_thumbnail
+        self.on_click = on_click
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.prefetch_rows = prefetch_rows
+        self.reflow_delay = reflow_delay
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, yscrollincrement=cell_height // 3)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Пути всех изображений; виджеты и PhotoImage создаются только для видимых
+        self.paths = []
+        self.columns_count = 1
+        self.items = {}  # индекс -> id элемента на холсте
+        self.photos = {}  # индекс -> PhotoImage
+        self.free_items = []  # переиспользуемые элементы холста
+        self.requested = set()  # пути, которые сейчас декодируются
+        self.flagged = {}  # путь -> подпись поверх миниатюры (например, "Дубликат")
+        self.labels = {}  # индекс -> id подписи на холсте
+
+        # Отложенные операции: перестроение после изменения размера и обновление после вставок
+        self.pending_width = None
+        self.reflow_id = None
+        self.flush_id = None
+
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<Button-1>", self._on_canvas_click)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda event: self._scroll(-1))
+        self.canvas.bind("<Button-5>", lambda event: self._scroll(1))
+
+    def add(self, file_path):
+        """Добавляет изображение в конец сетки.
+
+        Раскладка не пересчитывается на каждую вставку: пачка добавлений
+        обрабатывается одним обновлением в after_idle.
+        """
+        self.paths.append(file_path)
+        if self.flush_id is None:
+            self.flush_id = self.after_idle(self._flush)
+
+    def _flush(self):
+        self.flush_id = None
+        self._update_scrollregion()
+        self.refresh()
+
+    def set_thumbnail(self, file_path, photo):
+        """Показывает готовую миниатюру, если ее ячейка все еще видна."""
+        self.requested.discard(file_path)
+        for index in self.items:
+            if self.paths[index] == file_path and index not in self.photos:
+                self.photos[index] = photo
+                self.canvas.itemconfigure(self.items[index], image=photo)
+
+    def thumbnail_failed(self, file_path):
+        self.requested.discard(file_path)
+
+    def reload(self, file_path):
+        """Снимает пометку и заново запрашивает миниатюру изображения, которое изменилось на диске."""
+        self.flagged.pop(file_path, None)
+        for index in list(self.items):
+            if self.paths[index] == file_path:
+                self.photos.pop(index, None)
+                self.canvas.itemconfigure(self.items[index], image="")
+                if index in self.labels:
+                    self.canvas.delete(self.labels.pop(index), f"label_background_{index}")
+                if file_path not in self.requested:
+                    self.requested.add(file_path)
+                    self.request_thumbnail(file_path)
+
+    def mark(self, file_path, text):
+        """Помечает изображение подписью поверх миниатюры."""
+        self.flagged[file_path] = text
+        for index in self.items:
+            if self.paths[index] == file_path:
+                self._show_label(index)
+
+    def _show_label(self, index):
+        text = self.flagged.get(self.paths[index])
+        if text is None or index in self.labels:
+            return
+        x, y = self._cell_position(index)
+        self.labels[index] = self.canvas.create_text(
+            x, y + self.cell_height // 2 - 12, text=text, fill="white", font=("Arial", 10, "bold"))
+        self.canvas.create_rectangle(self.canvas.bbox(self.labels[index]), fill="red", outline="",
+                                     tags=f"label_background_{index}")
+        self.canvas.tag_raise(self.labels[index])
+
+    def refresh(self):
+        """Создает ячейки для видимых строк и освобождает ушедшие за пределы экрана."""
+        with span("layout", "ImageGrid.refresh", images=len(self.paths)):
+            self._refresh()
+
+    def _refresh(self):
+        first, last = self._visible_range()
+
+        for index in [index for index in self.items if not first <= index < last]:
+            item = self.items.pop(index)
+            self.photos.pop(index, None)
+            self.canvas.itemconfigure(item, image="", state=tk.HIDDEN)
+            self.free_items.append(item)
+            if index in self.labels:
+                self.canvas.delete(self.labels.pop(index), f"label_background_{index}")
+
+        for index in range(first, last):
+            if index in self.items:
+                continue
+            x, y = self._cell_position(index)
+            if self.free_items:
+                item = self.free_items.pop()
+                self.canvas.coords(item, x, y)
+                self.canvas.itemconfigure(item, state=tk.NORMAL)
+            else:
+                item = self.canvas.create_image(x, y, anchor=tk.CENTER)
+            self.items[index] = item
+            self._show_label(index)
+
+            file_path = self.paths[index]
+            if file_path not in self.requested:
+                self.requested.add(file_path)
+                self.request_thumbnail(file_path)
+
+    def _visible_range(self):
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.cell_height)
+        first_row = max(0, int(top // self.cell_height) - self.prefetch_rows)
+        last_row = int((top + height) // self.cell_height) + 1 + self.prefetch_rows
+        return first_row * self.columns_count, min(len(self.paths), last_row * self.columns_count)
+
+    def _cell_position(self, index):
+        row, column = divmod(index, self.columns_count)
+        return (column + 0.5) * self.cell_width, (row + 0.5) * self.cell_height
+
+    def _update_scrollregion(self):
+        rows = -(-len(self.paths) // self.columns_count)
+        width = self.columns_count * self.cell_width
+        self.canvas.configure(scrollregion=(0, 0, width, rows * self.cell_height))
+
+    def _relayout(self):
+        """Переносит видимые ячейки под новое количество колонок за один проход."""
+        self.reflow_id = None
+        columns_count = max(1, self.pending_width // self.cell_width)
+        if columns_count == self.columns_count:
+            self.refresh()
+            return
+
+        with span("layout", "ImageGrid.relayout", columns=columns_count):
+            self.columns_count = columns_count
+            self._update_scrollregion()
+            for index, item in self.items.items():
+                self.canvas.coords(item, *self._cell_position(index))
+            # Подписей мало, проще создать их заново в новых позициях
+            for index in list(self.labels):
+                self.canvas.delete(self.labels.pop(index), f"label_background_{index}")
+                self._show_label(index)
+        self.refresh()
+
+    def _on_configure(self, event):
+        # Во время перетаскивания края окна события идут потоком, перестраиваемся один раз в конце
+        self.pending_width = event.width
+        if self.reflow_id is not None:
+            self.after_cancel(self.reflow_id)
+        self.reflow_id = self.after(self.reflow_delay, self._relayout)
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def _scroll(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self.refresh()
+
+    def _on_mousewheel(self, event):
+        self._scroll(-1 if event.delta > 0 else 1)
+
+    def _on_canvas_click(self, event):
+        column = int(event.x // self.cell_width)
+        row = int(self.canvas.canvasy(event.y) // self.cell_height)
+        index = row * self.columns_count + column
+        if column < self.columns_count and index < len(self.paths):
+            self.on_click(self.paths[index])
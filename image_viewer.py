@@ -0,0 +1,175 @@
+import queue
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageTk
+
+from instrumentation import get_logger, span, track_photo
+from thumbnail_loader import DISPLAY_MODES, decode_thumbnail
+from tiled_view import TiledImageWindow
+
+logger = get_logger("image_viewer")
+
+
+def decode_full(file_path, size):
+    """Полное декодирование с качественным уменьшением под размер экрана."""
+    with Image.open(file_path) as image:
+        image.load()
+        result = image.copy()
+    result.thumbnail(size, Image.Resampling.LANCZOS)
+    if result.mode not in DISPLAY_MODES:
+        result = result.convert("RGB")
+    return result
+
+
+class ImageViewer(tk.Toplevel):
+    """Окно просмотра с листанием, LRU-кэшем и фоновой подготовкой соседних изображений."""
+
+    def __init__(self, parent, paths, index, cache_size=12, prefetch=2, poll_interval=30):
+        super().__init__(parent)
+        self.title("Просмотр изображения")
+        self.paths = paths
+        self.index = index
+        self.cache_size = cache_size
+        self.prefetch = prefetch
+        self.poll_interval = poll_interval
+        self.max_size = (int(self.winfo_screenwidth() * 0.8), int(self.winfo_screenheight() * 0.8) - 80)
+
+        self.image_label = tk.Label(self)
+        self.image_label.pack(padx=20, pady=20)
+
+        buttons = tk.Frame(self)
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="< Назад", command=self.show_previous).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Масштаб", command=self.open_zoom).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Закрыть", command=self.close).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Вперед >", command=self.show_next).pack(side=tk.LEFT, padx=5)
+
+        self.bind("<Left>", lambda event: self.show_previous())
+        self.bind("<Right>", lambda event: self.show_next())
+        self.bind("<Escape>", lambda event: self.close())
+        self.image_label.bind("<Double-1>", lambda event: self.open_zoom())
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Кэш путь -> (изображение, финальное качество); сначала быстрый черновик, затем LANCZOS
+        self.cache = OrderedDict()
+        self.in_flight = {}  # (путь, финальное качество) -> future
+        self.results = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.poll_id = None
+
+        self.show(index)
+
+    def show(self, index):
+        """Показывает изображение по индексу и подготавливает соседние."""
+        self.index = max(0, min(index, len(self.paths) - 1))
+        file_path = self.paths[self.index]
+        self.title(f"Просмотр изображения ({self.index + 1}/{len(self.paths)})")
+
+        cached = self.cache.get(file_path)
+        if cached is not None:
+            self.cache.move_to_end(file_path)
+            self._display(cached[0])
+
+        # Порядок важен: пул обрабатывает задачи по очереди
+        neighbours = [self.paths[i] for offset in range(1, self.prefetch + 1)
+                      for i in (self.index + offset, self.index - offset) if 0 <= i < len(self.paths)]
+
+        # При быстром листании задачи для уже пролистанных изображений не успевают начаться:
+        # снимаем их, чтобы текущее не ждало в очереди за ними
+        window = {file_path, *neighbours}
+        for key, future in list(self.in_flight.items()):
+            if key[0] not in window and future.cancel():
+                del self.in_flight[key]
+
+        self._request(file_path, final=False)
+        for path in neighbours:
+            self._request(path, final=False)
+        self._request(file_path, final=True)
+        for path in neighbours:
+            self._request(path, final=True)
+
+    def forget(self, file_path):
+        """Сбрасывает кэш изменившегося файла и, если он на экране, декодирует его заново."""
+        self.cache.pop(file_path, None)
+        if self.paths[self.index] == file_path:
+            self.show(self.index)
+
+    def show_next(self):
+        if self.index < len(self.paths) - 1:
+            self.show(self.index + 1)
+
+    def show_previous(self):
+        if self.index > 0:
+            self.show(self.index - 1)
+
+    def open_zoom(self):
+        """Открывает текущее изображение в полном разрешении с масштабированием."""
+        try:
+            TiledImageWindow(self, self.paths[self.index])
+        except Exception:
+            logger.exception("Не удалось открыть изображение")
+
+    def _request(self, file_path, final):
+        cached = self.cache.get(file_path)
+        if cached is not None and (cached[1] or not final):
+            return
+        if (file_path, final) in self.in_flight:
+            return
+        self.in_flight[(file_path, final)] = self.executor.submit(self._decode, file_path, final)
+        if self.poll_id is None:
+            self.poll_id = self.after(self.poll_interval, self._drain)
+
+    def _decode(self, file_path, final):
+        try:
+            with span("decode", "decode_full" if final else "decode_preview"):
+                if final:
+                    image = decode_full(file_path, self.max_size)
+                else:
+                    image = decode_thumbnail(file_path, self.max_size)
+            self.results.put((file_path, final, image, None))
+        except Exception as e:
+            self.results.put((file_path, final, None, e))
+
+    def _drain(self):
+        self.poll_id = None
+        while True:
+            try:
+                file_path, final, image, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.in_flight.pop((file_path, final), None)
+            current = file_path == self.paths[self.index]
+            if error is not None:
+                if current:
+                    logger.error("Не удалось открыть изображение: %s", error)
+                continue
+
+            cached = self.cache.get(file_path)
+            if cached is not None and cached[1] and not final:
+                continue
+            self.cache[file_path] = (image, final)
+            self.cache.move_to_end(file_path)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+            if current:
+                self._display(image)
+
+        if self.in_flight:
+            self.poll_id = self.after(self.poll_interval, self._drain)
+
+    def _display(self, image):
+        photo = track_photo(ImageTk.PhotoImage(image), "viewer")
+        self.image_label.config(image=photo)
+        self.image_label.photo = photo
+        self.geometry(f"{image.width + 40}x{image.height + 90}")
+
+    def close(self):
+        if self.poll_id is not None:
+            self.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
@@ -0,0 +1,69 @@
+import math
+from collections import deque
+
+ROLLING_WINDOW = 10
+
+
+class PlayerStats:
+    """Текущая статистика одного игрока, обновляемая за O(1) на каждую игру."""
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # сумма квадратов отклонений (алгоритм Уэлфорда)
+        self.best = None
+        self.worst = None
+        self.recent = deque(maxlen=window)
+        self.recent_total = 0
+
+    def add(self, score):
+        self.count += 1
+        self.total += score
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (score - self.mean)
+        self.best = score if self.best is None else max(self.best, score)
+        self.worst = score if self.worst is None else min(self.worst, score)
+
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_total -= self.recent[0]
+        self.recent.append(score)
+        self.recent_total += score
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def rolling_mean(self):
+        return self.recent_total / len(self.recent) if self.recent else 0.0
+
+
+class IncrementalStats:
+    """Статистика всех игроков; добавление игры обновляет только ее участников."""
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.players = {}
+
+    def clear(self):
+        self.players = {}
+
+    def add_game(self, game):
+        """Учитывает игру в формате result.json и возвращает имена обновленных игроков."""
+        updated = []
+        for player in game["players"]:
+            score = player["result"]
+            if score is None:  # очки не распознаны
+                continue
+            stats = self.players.get(player["player_name"])
+            if stats is None:
+                stats = self.players[player["player_name"]] = PlayerStats(self.window)
+            stats.add(score)
+            updated.append(player["player_name"])
+        return updated
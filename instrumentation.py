@@ -0,0 +1,212 @@
+"""Журнал, замеры этапов и задержек окна.
+
+Этапы (декодирование, миниатюры, раскладка, загрузка, экспорт, график)
+оборачиваются в span(): время копится в сводке по этапам и, если включена
+трассировка, пишется событием в формате Chrome trace (открывается в
+chrome://tracing или https://ui.perfetto.dev).
+
+Пример:
+    python main.py --trace session.json
+    INTERFACE_LOG_FORMAT=json python main.py
+"""
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+LOGGER_NAME = "interface"
+TRACE_LIMIT = 500000  # событий в памяти; старые вытесняются
+SLOW_FRAME_MS = 200  # задержка цикла событий, о которой пишется предупреждение
+
+_started = time.perf_counter()
+_lock = threading.Lock()
+_trace_events = None  # deque событий, если трассировка включена
+_trace_path = None
+_stages = {}  # этап -> [количество, суммарное время, максимум] в секундах
+_counters = {}  # имя -> текущее значение
+
+
+def get_logger(name):
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class StructuredFormatter(logging.Formatter):
+    """Строка "время уровень модуль: сообщение ключ=значение" или JSON Lines."""
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = getattr(record, "fields", {})
+        if self.json_lines:
+            entry = {"time": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                     "message": record.getMessage(), **fields}
+            if record.exc_info:
+                entry["exception"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        text = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+def configure_logging(level=None, json_lines=None):
+    """Настраивает вывод журнала в stderr; параметры по умолчанию берутся из окружения."""
+    level = level or os.environ.get("INTERFACE_LOG_LEVEL", "INFO")
+    if json_lines is None:
+        json_lines = os.environ.get("INTERFACE_LOG_FORMAT") == "json"
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(json_lines))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def fields(**values):
+    """Дополнительные поля записи журнала: logger.info("...", extra=fields(games=10))."""
+    return {"fields": values}
+
+
+# Трассировка и этапы
+
+def enable_trace(trace_path):
+    """Включает запись событий; файл пишется в finish()."""
+    global _trace_events, _trace_path
+    _trace_events = deque(maxlen=TRACE_LIMIT)
+    _trace_path = trace_path
+
+
+def _timestamp_us(moment):
+    return (moment - _started) * 1e6
+
+
+def _add_event(event):
+    if _trace_events is not None:
+        event.setdefault("pid", os.getpid())
+        event.setdefault("tid", threading.get_ident())
+        _trace_events.append(event)
+
+
+@contextmanager
+def span(stage, name=None, **args):
+    """Замеряет этап: время попадает в сводку и, при включенной трассировке, в файл трассы."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        with _lock:
+            totals = _stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+        _add_event({"name": name or stage, "cat": stage, "ph": "X", "ts": _timestamp_us(started),
+                    "dur": duration * 1e6, "args": args})
+
+
+def counter(name, value):
+    """Запоминает текущее значение счетчика и пишет его в трассу."""
+    with _lock:
+        _counters[name] = value
+    _add_event({"name": name, "ph": "C", "ts": _timestamp_us(time.perf_counter()), "args": {name: value}})
+
+
+def add_to_counter(name, delta):
+    with _lock:
+        value = _counters[name] = _counters.get(name, 0) + delta
+    _add_event({"name": name, "ph": "C", "ts": _timestamp_us(time.perf_counter()), "args": {name: value}})
+
+
+def stage_summary():
+    """Возвращает {этап: {"count", "total_ms", "mean_ms", "max_ms"}}."""
+    with _lock:
+        return {stage: {"count": count, "total_ms": round(total * 1000, 1),
+                        "mean_ms": round(total / count * 1000, 2), "max_ms": round(longest * 1000, 1)}
+                for stage, (count, total, longest) in _stages.items()}
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+# Память изображений Tk
+
+def track_photo(photo, kind):
+    """Учитывает PhotoImage в счетчиках "photos.<kind>" и "photos.<kind>.bytes" до его удаления."""
+    size = photo.width() * photo.height() * 4  # Tk хранит пиксели в RGBA
+    add_to_counter(f"photos.{kind}", 1)
+    add_to_counter(f"photos.{kind}.bytes", size)
+    weakref.finalize(photo, _forget_photo, kind, size)
+    return photo
+
+
+def _forget_photo(kind, size):
+    add_to_counter(f"photos.{kind}", -1)
+    add_to_counter(f"photos.{kind}.bytes", -size)
+
+
+class EventLoopMonitor:
+    """Замеряет задержку цикла событий Tk: насколько позже запланированного срабатывает after().
+
+    Если окно "зависло", очередной замер приходит с большим опозданием;
+    такие случаи пишутся в журнал предупреждением, а все замеры — в трассу.
+    """
+
+    def __init__(self, widget, interval=100, threshold_ms=SLOW_FRAME_MS):
+        self.widget = widget
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        self.logger = get_logger("event_loop")
+        self.expected = None
+        self.after_id = None
+        self.max_lag_ms = 0.0
+        self.slow_count = 0
+
+    def start(self):
+        self.expected = time.perf_counter() + self.interval / 1000
+        self.after_id = self.widget.after(self.interval, self._probe)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _probe(self):
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self.expected) * 1000)
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        counter("event_loop.lag_ms", round(lag_ms, 1))
+        if lag_ms >= self.threshold_ms:
+            self.slow_count += 1
+            self.logger.warning("Окно не отвечало", extra=fields(lag_ms=round(lag_ms)))
+            _add_event({"name": "event_loop_stall", "cat": "event_loop", "ph": "X",
+                        "ts": _timestamp_us(self.expected), "dur": lag_ms * 1000})
+        self.expected = now + self.interval / 1000
+        self.after_id = self.widget.after(self.interval, self._probe)
+
+
+def finish(monitor=None):
+    """Пишет в журнал сводку по этапам и сохраняет трассу, если она включена."""
+    logger = get_logger("profile")
+    for stage, summary in sorted(stage_summary().items()):
+        logger.info("Этап %s", stage, extra=fields(**summary))
+    if monitor is not None:
+        logger.info("Цикл событий", extra=fields(max_lag_ms=round(monitor.max_lag_ms), stalls=monitor.slow_count))
+    photos = {name: value for name, value in counters().items() if name.startswith("photos.")}
+    if photos:
+        logger.info("Изображения Tk в памяти", extra=fields(**photos))
+
+    if _trace_events is not None and _trace_path:
+        with open(_trace_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": list(_trace_events), "displayTimeUnit": "ms"}, f)
+        logger.info("Трасса сохранена", extra=fields(path=_trace_path, events=len(_trace_events)))
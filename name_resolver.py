@@ -0,0 +1,148 @@
+import json
+import unicodedata
+from collections import Counter
+
+from instrumentation import fields, get_logger
+from players import PLAYERS_FILE, load_player_aliases
+
+logger = get_logger("name_resolver")
+
+MIN_SIMILARITY = 0.3  # доля общих триграмм (коэффициент Дайса) для отбора кандидатов
+MIN_FUZZY_LETTERS = 6  # более короткие имена ("Маша", "Даша") сопоставляются только точно или через aliases
+
+
+def normalize_name(player_name):
+    """Приводит имя к виду для сравнения: регистр, ё/е, без пробелов и знаков препинания."""
+    text = unicodedata.normalize("NFKC", player_name).casefold().replace("ё", "е")
+    return "".join(character for character in text if character.isalnum())
+
+
+def split_digits(key):
+    """Разделяет нормализованное имя на буквы и цифры: ("игрок", "1")."""
+    letters = "".join(character for character in key if not character.isdigit())
+    return letters, "".join(character for character in key if character.isdigit())
+
+
+def trigrams(letters):
+    padded = f"^{letters}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(first, second, limit):
+    """Расстояние Левенштейна или limit + 1, если оно заведомо больше limit."""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, first_character in enumerate(first, 1):
+        current = [i]
+        for j, second_character in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (first_character != second_character)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class NameResolver:
+    """Сопоставляет написания имен из листов и старых файлов с игроками из таблицы.
+
+    Сначала ищется точное совпадение нормализованного имени или псевдонима,
+    затем, для имен не короче MIN_FUZZY_LETTERS букв, единственное ближайшее
+    имя среди похожих по триграммам; каждое такое сопоставление пишется в
+    журнал. Цифры должны совпадать точно, чтобы "Игрок 1" и "Игрок 2" не
+    склеивались. Ответы кэшируются, поэтому повторные имена разрешаются
+    одним поиском в словаре.
+    """
+
+    def __init__(self, player_names=(), aliases=None, min_similarity=MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.canonical = {}  # нормализованное имя или псевдоним -> имя игрока
+        self.keys = []  # нормализованные ключи по порядку
+        self.key_trigrams = []  # число триграмм букв каждого ключа
+        self.index = {}  # (цифры, триграмма букв) -> [номер ключа, ...]
+        self.resolved = {}  # исходное написание -> имя игрока
+
+        for player_name in player_names:
+            self.add(player_name, player_name)
+        for player_name, player_aliases in (aliases or {}).items():
+            for alias in player_aliases:
+                self.add(alias, player_name)
+
+    @classmethod
+    def from_players_file(cls, json_file_path=PLAYERS_FILE):
+        """Строит индекс по players.json; без файла имена остаются как есть."""
+        try:
+            aliases = load_player_aliases(json_file_path)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.warning("Не удалось загрузить игроков для сопоставления имен: %s", e)
+            return cls()
+        return cls(aliases, aliases)
+
+    def add(self, spelling, player_name):
+        key = normalize_name(spelling)
+        if not key or key in self.canonical:
+            return
+        self.canonical[key] = player_name
+        letters, digits = split_digits(key)
+        key_id = len(self.keys)
+        self.keys.append(key)
+        letter_trigrams = trigrams(letters)
+        self.key_trigrams.append(len(letter_trigrams))
+        for trigram in letter_trigrams:
+            self.index.setdefault((digits, trigram), []).append(key_id)
+        self.resolved.clear()
+
+    def resolve(self, player_name):
+        """Возвращает имя игрока из таблицы или исходное имя, если похожих нет."""
+        resolved = self.resolved.get(player_name)
+        if resolved is None:
+            resolved = self.resolved[player_name] = self._lookup(player_name)
+        return resolved
+
+    def _lookup(self, player_name):
+        key = normalize_name(player_name)
+        if key in self.canonical:
+            return self.canonical[key]
+
+        # У коротких имен одна буква отличает разных людей, для них нужен псевдоним
+        letters, digits = split_digits(key)
+        if len(letters) < MIN_FUZZY_LETTERS:
+            return player_name
+
+        # Кандидаты — ключи с теми же цифрами и хотя бы одной общей триграммой букв
+        letter_trigrams = trigrams(letters)
+        shared = Counter()
+        for trigram in letter_trigrams:
+            shared.update(self.index.get((digits, trigram), ()))
+
+        # Триграммы отбирают кандидатов, редактирующее расстояние подтверждает совпадение
+        limit = max(1, len(letters) // 4)
+        best_distance = limit + 1
+        best_names = set()
+        for key_id, count in shared.items():
+            if 2 * count / (len(letter_trigrams) + self.key_trigrams[key_id]) < self.min_similarity:
+                continue
+            distance = edit_distance(letters, split_digits(self.keys[key_id])[0], limit)
+            if distance > limit:
+                continue
+            if distance < best_distance:
+                best_distance, best_names = distance, {self.canonical[self.keys[key_id]]}
+            elif distance == best_distance:
+                best_names.add(self.canonical[self.keys[key_id]])
+
+        # Склеиваем, только если ближайший игрок один; иначе имя остается отдельным
+        if len(best_names) != 1:
+            if best_names:
+                logger.warning("Имя похоже на нескольких игроков и оставлено как есть",
+                               extra=fields(name=player_name, candidates=sorted(best_names)))
+            return player_name
+        best_name = best_names.pop()
+        logger.info("Имя сопоставлено с игроком нестрого",
+                    extra=fields(name=player_name, player=best_name, distance=best_distance))
+        return best_name
+
+    def resolve_game(self, game):
+        """Возвращает копию игры в формате result.json с именами игроков из таблицы."""
+        players = [{**player, "player_name": self.resolve(player["player_name"])} for player in game["players"]]
+        return {**game, "players": players}
@@ -1,10 +1,29 @@
+import time
+
+# Отсчет времени запуска начинается до всех остальных импортов
+STARTED_AT = time.perf_counter()
+
 import tkinter as tk
-from tkinter import filedialog, ttk
+from tkinter import filedialog, messagebox, ttk
 from tkinterdnd2 import TkinterDnD
-from PIL import Image, ImageTk
+import json
+import multiprocessing
 import os
+import queue
 import re
-import json
+import sys
+import threading
+
+# Тяжелые модули (PIL, NumPy, matplotlib, openpyxl) импортируются при первом
+# использовании соответствующей функции, чтобы окно появлялось сразу
+from image_grid import ImageGrid, THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT
+from instrumentation import EventLoopMonitor, configure_logging, enable_trace, fields, finish, get_logger, span
+from players import PLAYERS_FILE, save_player_names
+
+RESULTS_FILE = "result.json"
+GAMES_PER_POLL = 2000  # игр, передаваемых странице результатов за один вызов after()
+
+logger = get_logger("main")
 
 
 class ImageApp(TkinterDnD.Tk):
@@ -40,12 +59,12 @@ class ImageApp(TkinterDnD.Tk):
         self.choose_files_button = tk.Button(self, text="Выбрать файлы", command=self.choose_files)
         self.choose_files_button.pack(pady=10)
 
+        self.watch_button = tk.Button(self, text="Следить за папкой", command=self.toggle_watch)
+        self.watch_button.pack()
+
         self.drop_label = tk.Label(self, text="Или перетащите изображения сюда", bg="lightgray", width=50, height=5)
         self.drop_label.pack(pady=20)
 
-        self.image_frame = tk.Frame(self, bd=2, relief=tk.SUNKEN)
-        self.image_frame.pack(pady=20, fill=tk.BOTH, expand=True)
-
         self.drop_label.drop_target_register('DND_Files')
         self.drop_label.dnd_bind('<<Drop>>', self.on_drop)
 
@@ -54,6 +73,35 @@ class ImageApp(TkinterDnD.Tk):
 
         # Хранение изображений
         self.images = []
+        self.viewer = None
+
+        # Загрузчик миниатюр создается при первом запросе миниатюры
+        self.thumbnail_loader = None
+
+        # Проверка на повторно добавленные листы; хеши считаются в фоне
+        self.added_paths = set()
+        self.duplicate_checker = None
+
+        # Фоновые обходы перетащенных папок
+        self.scanners = []
+        self.scan_poll_id = None
+
+        # Наблюдение за папкой с новыми фотографиями
+        self.folder_watcher = None
+        self.watch_poll_id = None
+        self.changed_paths = set()  # уже добавленные файлы, измененные на диске и ожидающие повторной проверки
+
+        # В сетке живут только миниатюры видимых строк, остальные подгружаются при прокрутке
+        self.image_grid = ImageGrid(self, self.request_thumbnail, self.open_large_image,
+                                    cell_width=THUMBNAIL_WIDTH + 10, cell_height=THUMBNAIL_HEIGHT + 10,
+                                    bd=2, relief=tk.SUNKEN)
+        self.image_grid.pack(pady=20, fill=tk.BOTH, expand=True, before=self.process_button)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Задержки цикла событий общие для всех окон приложения, поэтому замеряются на корневом
+        self.event_loop_monitor = EventLoopMonitor(self)
+        self.event_loop_monitor.start()
 
     def add_player_row(self):
         """Добавляет пустую строку для имени игрока."""
@@ -92,22 +140,111 @@ class ImageApp(TkinterDnD.Tk):
             entry.bind("<FocusOut>", save_edit)
 
     def save_names_to_json(self):
-        """Сохраняет введенные имена игроков в JSON-файл."""
+        """Сохраняет введенные имена игроков в JSON-файл и возвращает их."""
         try:
-            players_data = [{"player_name": self.player_table.item(row_id, "values")[0]}
+            player_names = [self.player_table.item(row_id, "values")[0]
                             for row_id in self.player_table.get_children()]
+            save_player_names(player_names, PLAYERS_FILE)
 
-            with open("players.json", "w", encoding="utf-8") as f:
-                json.dump(players_data, f, ensure_ascii=False, indent=4)
-
-            print("Имена игроков успешно сохранены в 'players.json'.")
-        except Exception as e:
-            print(f"Ошибка при сохранении имен игроков: {e}")
+            logger.info("Имена игроков сохранены", extra=fields(path=PLAYERS_FILE, players=len(player_names)))
+            return player_names
+        except Exception:
+            logger.exception("Ошибка при сохранении имен игроков")
+            return []
 
     def save_names_and_open_results(self):
-        """Сохраняет имена игроков и открывает страницу результатов."""
-        self.save_names_to_json()
-        print("Открытие страницы результатов...")
+        """Сохраняет имена игроков, распознает изображения и открывает страницу результатов."""
+        # Побайтные копии можно отсеять, только когда посчитаны хеши всех добавленных файлов
+        if self.duplicate_checker is not None and self.duplicate_checker.pending > 0:
+            self.process_button.config(state=tk.DISABLED)
+            self.drop_label.config(text=f"Проверка на повторы, осталось файлов: {self.duplicate_checker.pending}...")
+            self.after(200, self.save_names_and_open_results)
+            return
+        self.process_button.config(state=tk.NORMAL)
+
+        player_names = self.save_names_to_json()
+        # Побайтные копии одного файла не распознаются, чтобы игра не учитывалась дважды;
+        # похожие снимки исключаются, только если пользователь это подтвердит
+        file_paths = list(self.images)
+        if self.duplicate_checker is not None:
+            index = self.duplicate_checker.index
+            file_paths = [path for path in file_paths if not index.is_exact_duplicate(path)]
+            near_duplicates = index.near_duplicates(file_paths)
+            if near_duplicates and messagebox.askyesno(
+                    "Похожие снимки",
+                    f"Похожих на уже добавленные снимков: {len(near_duplicates)}. Это могут быть повторные "
+                    "фотографии того же листа. Исключить их из обработки?", default=messagebox.NO):
+                excluded = set(near_duplicates)
+                file_paths = [path for path in file_paths if path not in excluded]
+        if not player_names or not file_paths:
+            self.drop_label.config(text="Добавьте игроков и изображения перед обработкой")
+            return
+
+        from batch_cli import process_files
+
+        # Распознавание идет в отдельных процессах, окно остается отзывчивым;
+        # распознанные игры сразу появляются на странице результатов
+        self.process_button.config(state=tk.DISABLED)
+        self.drop_label.config(text=f"Обработка изображений: {len(file_paths)}...")
+        games = queue.Queue()
+        worker = threading.Thread(target=self._process_files, args=(process_files, file_paths, player_names, games),
+                                  daemon=True)
+        worker.start()
+        self.after(200, self._wait_for_processing, worker, games, self._open_results_page())
+
+    def _process_files(self, process_files, file_paths, player_names, games):
+        """Дописывает в RESULTS_FILE игры с еще не распознанных фото; на страницу идут и прежние, и новые игры."""
+        from results_loader import GameReader
+
+        # Прежние игры читаются до того, как process_files начнет дописывать файл
+        try:
+            for game in GameReader(RESULTS_FILE):
+                games.put(game)
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError as e:
+            # Оборванный прошлым запуском файл: целые игры уже переданы, process_files продолжит после них
+            logger.warning("Файл результатов прочитан не полностью: %s", e)
+
+        with span("recognition", "process_files", images=len(file_paths)):
+            # Уже распознанные фото пропускаются, номера игр продолжаются;
+            # рабочие процессы запускаются через spawn, а не fork процесса с пулами потоков
+            process_files(file_paths, player_names, RESULTS_FILE, resume=True, on_game=games.put,
+                          mp_context=multiprocessing.get_context("spawn"))
+
+    def _open_results_page(self):
+        logger.info("Открытие страницы результатов")
+        try:
+            from results_page import ResultsPage
+
+            results_page = ResultsPage(self)
+            results_page.show()
+            results_page.start_live()
+            return results_page
+        except Exception:
+            logger.exception("Не удалось открыть страницу результатов")
+            return None
+
+    def _wait_for_processing(self, worker, games, results_page):
+        """Передает распознанные игры на страницу результатов, пока идет обработка."""
+        # Состояние потока проверяется до разбора очереди, чтобы не потерять последние игры
+        finished = not worker.is_alive()
+        for _ in range(GAMES_PER_POLL):
+            try:
+                game = games.get_nowait()
+            except queue.Empty:
+                break
+            # Пользователь мог вернуться со страницы результатов: очередь все равно разбирается до конца
+            if results_page is not None and results_page.winfo_exists():
+                results_page.append_game(game)
+        if not finished or not games.empty():
+            # Пока в очереди есть игры (например, прежние из файла), следующая порция берется сразу
+            self.after(1 if not games.empty() else 200, self._wait_for_processing, worker, games, results_page)
+            return
+
+        self.process_button.config(state=tk.NORMAL)
+        self.drop_label.config(text="Или перетащите изображения сюда")
+        logger.info("Обработка изображений завершена")
 
     def choose_files(self):
         file_paths = filedialog.askopenfilenames(
@@ -115,8 +252,55 @@ class ImageApp(TkinterDnD.Tk):
             filetypes=(("Изображения", "*.png *.jpg *.jpeg *.bmp *.gif"), ("Все файлы", "*.*"))
         )
         if file_paths:
-            for file_path in file_paths:
-                self.display_image(file_path)
+            self.add_paths(file_paths)
+
+    def toggle_watch(self):
+        """Включает или выключает наблюдение за папкой с поступающими фотографиями."""
+        if self.folder_watcher is not None:
+            self.stop_watch()
+            return
+
+        directory = filedialog.askdirectory(title="Выберите папку для наблюдения")
+        if not directory:
+            return
+
+        from folder_watcher import FolderWatcher
+
+        try:
+            self.folder_watcher = FolderWatcher(directory)
+        except OSError as e:
+            self.drop_label.config(text=f"Ошибка: не удалось следить за папкой: {e}")
+            return
+        self.folder_watcher.start()
+        self.watch_button.config(text=f"Остановить наблюдение ({os.path.basename(directory)})")
+        self.watch_poll_id = self.after(500, self._poll_watch)
+
+    def stop_watch(self):
+        if self.watch_poll_id is not None:
+            self.after_cancel(self.watch_poll_id)
+            self.watch_poll_id = None
+        self.folder_watcher.stop()
+        self.folder_watcher = None
+        self.watch_button.config(text="Следить за папкой")
+
+    def _poll_watch(self):
+        """Передает готовые файлы из наблюдателя тем же путем, что и перетаскивание."""
+        self.watch_poll_id = None
+        file_paths = self.folder_watcher.drain()
+        if file_paths:
+            # Уже добавленный файл, отданный наблюдателем еще раз, изменился на диске
+            self.changed_paths.update(os.path.abspath(file_path) for file_path in file_paths
+                                      if os.path.abspath(file_path) in self.added_paths)
+            self.add_paths(file_paths)
+            self.folder_watcher.mark_handled(file_paths)
+
+        if self.folder_watcher.running:
+            self.watch_poll_id = self.after(500, self._poll_watch)
+            return
+        error = self.folder_watcher.error
+        self.stop_watch()
+        if error is not None:
+            self.drop_label.config(text=f"Наблюдение за папкой остановлено: {error}")
 
     def on_drop(self, event):
         file_paths = self.extract_file_paths(event.data)
@@ -124,12 +308,40 @@ class ImageApp(TkinterDnD.Tk):
             self.drop_label.config(text="Ошибка: не удалось извлечь файлы из перетаскивания")
             return
 
-        for file_path in file_paths:
-            file_path = file_path.strip('{}')
-            if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif')):
+        self.add_paths([file_path.strip('{}') for file_path in file_paths])
+
+    def add_paths(self, paths):
+        """Добавляет файлы и папки (рекурсивно); формат определяется по содержимому в фоне."""
+        from folder_scan import FolderScanner
+
+        scanner = FolderScanner()
+        scanner.scan(paths)
+        self.scanners.append(scanner)
+        if self.scan_poll_id is None:
+            self.scan_poll_id = self.after(50, self._poll_scanners)
+
+    def _poll_scanners(self):
+        """Переносит найденные изображения в сетку по мере обхода папок."""
+        self.scan_poll_id = None
+        for scanner in list(self.scanners):
+            finished = scanner.done
+            for file_path in scanner.drain(limit=1000):
                 self.display_image(file_path)
-            else:
-                self.drop_label.config(text=f"Файл '{file_path}' не является изображением")
+            if finished and scanner.results.empty():
+                self.scanners.remove(scanner)
+                self._report_scan(scanner)
+        if self.scanners:
+            self.scan_poll_id = self.after(50, self._poll_scanners)
+
+    def _report_scan(self, scanner):
+        if not scanner.skipped:
+            return
+        file_path, reason = scanner.skipped[-1]
+        if scanner.images_found == 0 and len(scanner.skipped) == 1:
+            self.drop_label.config(text=f"Файл '{file_path}' {reason}")
+        else:
+            self.drop_label.config(
+                text=f"Добавлено изображений: {scanner.images_found}, пропущено файлов: {len(scanner.skipped)}")
 
     def extract_file_paths(self, data):
         file_paths = re.findall(r'\{[^}]+\}|[^\s\{]+', data)
@@ -138,65 +350,130 @@ class ImageApp(TkinterDnD.Tk):
         return file_paths
 
     def display_image(self, file_path):
-        try:
-            if not os.path.exists(file_path):
-                self.drop_label.config(text=f"Ошибка: файл '{file_path}' не существует")
-                return
-
-            self.images.append(file_path)
-            image = Image.open(file_path)
-            image_width = 200
-            image_height = 150
-            image.thumbnail((image_width, image_height))
-            photo = ImageTk.PhotoImage(image)
-
-            image_label = tk.Label(self.image_frame, image=photo)
-            image_label.photo = photo
-
-            i = len(self.images) - 1
-            columns_count = self.image_frame.winfo_width() // image_width
-            image_label.grid(row=i // columns_count, column=i % columns_count)
-
-            image_label.bind("<Button-1>", lambda event, path=file_path: self.open_large_image(path))
+        if not os.path.exists(file_path):
+            self.drop_label.config(text=f"Ошибка: файл '{file_path}' не существует")
+            return
+        if os.path.abspath(file_path) in self.added_paths:
+            if os.path.abspath(file_path) in self.changed_paths:
+                self.changed_paths.discard(os.path.abspath(file_path))
+                self.reload_image(file_path)
+            else:
+                self.drop_label.config(text=f"Файл '{file_path}' уже добавлен")
+            return
 
-        except Exception as e:
-            self.drop_label.config(text=f"Ошибка при загрузке изображения: {str(e)}")
+        self.added_paths.add(os.path.abspath(file_path))
+        self.images.append(file_path)
+        self.image_grid.add(file_path)
+        self.check_duplicate(file_path)
+
+    def reload_image(self, file_path):
+        """Заново принимает измененный файл: миниатюра, просмотр и проверка на повтор пересчитываются."""
+        # Файл мог быть добавлен под другим написанием пути
+        file_path = next((path for path in self.images
+                          if os.path.abspath(path) == os.path.abspath(file_path)), file_path)
+        logger.info("Файл изменился, проверяется заново", extra=fields(path=file_path))
+        self.image_grid.reload(file_path)
+        if self.viewer is not None and self.viewer.winfo_exists():
+            self.viewer.forget(file_path)
+        if self.duplicate_checker is not None:
+            for copy_path in self.duplicate_checker.index.remove(file_path):
+                self.image_grid.reload(copy_path)
+                self.check_duplicate(copy_path)
+        self.check_duplicate(file_path)
+
+    def check_duplicate(self, file_path):
+        """Ставит файл в очередь на хеширование и сравнение с уже добавленными листами."""
+        if self.duplicate_checker is None:
+            from duplicate_index import DuplicateChecker
+
+            self.duplicate_checker = DuplicateChecker(self, self.on_duplicate)
+        self.duplicate_checker.submit(file_path)
+
+    def on_duplicate(self, file_path, kind, original):
+        name, original_name = os.path.basename(file_path), os.path.basename(original)
+        if kind == "exact":
+            self.image_grid.mark(file_path, "Дубликат")
+            self.drop_label.config(text=f"'{name}' совпадает с '{original_name}' и не будет обработан")
+        else:
+            self.image_grid.mark(file_path, "Похожий снимок")
+            self.drop_label.config(text=f"'{name}' похож на '{original_name}', проверьте перед обработкой")
+
+    def request_thumbnail(self, file_path):
+        """Ставит миниатюру в очередь на декодирование, при первом вызове загружая PIL."""
+        if self.thumbnail_loader is None:
+            from thumbnail_cache import ThumbnailCache
+            from thumbnail_loader import ThumbnailLoader
+
+            # Миниатюры декодируются в фоне и добавляются в сетку пачками;
+            # уже виденные файлы берутся из дискового кэша без декодирования
+            self.thumbnail_loader = ThumbnailLoader(self, self.add_thumbnail, self.on_thumbnail_error,
+                                                    cache=ThumbnailCache())
+        self.thumbnail_loader.submit(file_path)
+
+    def add_thumbnail(self, file_path, photo):
+        """Передает готовую миниатюру в сетку изображений."""
+        self.image_grid.set_thumbnail(file_path, photo)
+
+    def on_thumbnail_error(self, file_path, error):
+        self.image_grid.thumbnail_failed(file_path)
+        self.drop_label.config(text=f"Ошибка при загрузке изображения: {str(error)}")
 
     def open_large_image(self, file_path):
-        try:
-            image = Image.open(file_path)
-            max_width = 800
-            max_height = 600
-            img_width, img_height = image.size
-            aspect_ratio = img_width / img_height
-
-            if img_width > max_width or img_height > max_height:
-                if aspect_ratio > 1:
-                    new_width = max_width
-                    new_height = int(new_width / aspect_ratio)
-                else:
-                    new_height = max_height
-                    new_width = int(new_height * aspect_ratio)
-
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            top = tk.Toplevel(self)
-            top.title("Просмотр изображения")
-
-            photo = ImageTk.PhotoImage(image)
-            image_label = tk.Label(top, image=photo)
-            image_label.photo = photo
-            image_label.pack(padx=20, pady=20)
-
-            top.geometry(f"{image.width + 40}x{image.height + 40}")
-
-            close_button = tk.Button(top, text="Закрыть", command=top.destroy)
-            close_button.pack(pady=10)
-
-        except Exception as e:
-            print(f"Не удалось открыть изображение: {e}")
+        """Открывает изображение в окне просмотра с листанием (одно окно на приложение)."""
+        from image_viewer import ImageViewer
+
+        index = self.images.index(file_path)
+        if self.viewer is not None and self.viewer.winfo_exists():
+            self.viewer.show(index)
+            self.viewer.lift()
+        else:
+            self.viewer = ImageViewer(self, self.images, index)
+
+    def on_close(self):
+        for scanner in self.scanners:
+            scanner.cancel()
+        if self.folder_watcher is not None:
+            self.stop_watch()
+        if self.duplicate_checker is not None:
+            self.duplicate_checker.shutdown()
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.shutdown()
+        self.event_loop_monitor.stop()
+        finish(self.event_loop_monitor)
+        self.destroy()
+
+
+def report_startup_time(app, exit_after=False):
+    """Печатает время от начала выполнения main.py до первой отрисовки окна.
+
+    Запуск самого интерпретатора в это время не входит: STARTED_AT
+    запоминается первой строкой main.py. С флагом --measure-startup выводит
+    JSON и завершает работу, чтобы время запуска можно было сравнивать между версиями.
+    """
+    def on_first_paint():
+        startup_ms = (time.perf_counter() - STARTED_AT) * 1000
+        if exit_after:
+            print(json.dumps({"startup_ms": round(startup_ms, 1), "modules": len(sys.modules)}))
+            app.destroy()
+        else:
+            logger.info("Окно показано", extra=fields(startup_ms=round(startup_ms)))
+
+    app.update_idletasks()
+    app.after_idle(on_first_paint)
+
+
+def trace_path_from_args(argv):
+    """Путь файла трассы из --trace FILE или переменной INTERFACE_TRACE."""
+    if "--trace" in argv and argv.index("--trace") + 1 < len(argv):
+        return argv[argv.index("--trace") + 1]
+    return os.environ.get("INTERFACE_TRACE")
 
 
 if __name__ == "__main__":
+    configure_logging()
+    trace_path = trace_path_from_args(sys.argv)
+    if trace_path:
+        enable_trace(trace_path)
     app = ImageApp()
+    report_startup_time(app, exit_after="--measure-startup" in sys.argv)
     app.mainloop()
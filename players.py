@@ -0,0 +1,32 @@
+import json
+
+PLAYERS_FILE = "players.json"
+
+
+def load_player_names(json_file_path=PLAYERS_FILE):
+    """Загружает имена игроков из JSON-файла в формате [{"player_name": ...}, ...]."""
+    with open(json_file_path, "r", encoding="utf-8") as f:
+        return [player["player_name"] for player in json.load(f)]
+
+
+def load_player_aliases(json_file_path=PLAYERS_FILE):
+    """Загружает {имя: [другие написания, ...]} из необязательного поля "aliases"."""
+    with open(json_file_path, "r", encoding="utf-8") as f:
+        return {player["player_name"]: player.get("aliases", []) for player in json.load(f)}
+
+
+def save_player_names(player_names, json_file_path=PLAYERS_FILE):
+    """Сохраняет имена игроков в JSON-файл, сохраняя уже заданные для них написания."""
+    try:
+        aliases = load_player_aliases(json_file_path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        aliases = {}
+
+    players_data = []
+    for name in player_names:
+        player = {"player_name": name}
+        if aliases.get(name):
+            player["aliases"] = aliases[name]
+        players_data.append(player)
+    with open(json_file_path, "w", encoding="utf-8") as f:
+        json.dump(players_data, f, ensure_ascii=False, indent=4)
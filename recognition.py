@@ -0,0 +1,233 @@
+"""Распознавание итоговых очков на фотографиях листов с таблицей результатов.
+
+Ожидаемый лист: таблица с линиями сетки, первая строка - заголовок, далее по
+строке на игрока в порядке таблицы игроков, итог записан в последней колонке.
+"""
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+WORK_SIDE = 1600  # размер по длинной стороне, до которого уменьшается фото
+GLYPH_SHAPE = (24, 16)  # высота и ширина нормализованной цифры
+SKEW_ANGLES = np.arange(-5.0, 5.01, 0.5)
+
+
+def to_gray(image, max_side=WORK_SIDE):
+    """Переводит изображение в оттенки серого и уменьшает до рабочего размера."""
+    image.draft("L", (max_side, max_side))
+    image = image.convert("L")
+    scale = max_side / max(image.size)
+    if scale < 1:
+        image = image.resize((round(image.width * scale), round(image.height * scale)), Image.Resampling.BILINEAR)
+    return image
+
+
+def otsu_threshold(gray):
+    """Порог Оцу по гистограмме яркостей."""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_dark = np.cumsum(histogram)
+    weight_light = weight_dark[-1] - weight_dark
+    sum_dark = np.cumsum(histogram * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    between = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(np.argmax(between))
+
+
+def binarize(gray):
+    """Возвращает булеву маску чернил (True - темный пиксель)."""
+    return gray <= otsu_threshold(gray)
+
+
+def estimate_skew(ink, angles=SKEW_ANGLES, max_points=50000):
+    """Находит угол, при котором проекция строк максимально контрастна."""
+    ys, xs = np.nonzero(ink)
+    if len(ys) == 0:
+        return 0.0
+    if len(ys) > max_points:
+        step = len(ys) // max_points + 1
+        ys, xs = ys[::step], xs[::step]
+
+    radians = np.deg2rad(angles)
+    # Повернутые координаты строк для всех углов сразу: матрица (углы, точки)
+    rotated = np.rint(ys[None, :] * np.cos(radians)[:, None] - xs[None, :] * np.sin(radians)[:, None]).astype(np.int64)
+    rotated -= rotated.min()
+    height = rotated.max() + 1
+    offsets = np.arange(len(angles))[:, None] * height
+    profiles = np.bincount((rotated + offsets).ravel(), minlength=len(angles) * height).reshape(len(angles), height)
+    return float(angles[np.argmax((profiles.astype(np.float64) ** 2).sum(axis=1))])
+
+
+def deskew(gray_image):
+    """Выравнивает лист по горизонтали и возвращает массив яркостей."""
+    gray = np.asarray(gray_image)
+    ink = binarize(gray)
+    # Грубый поиск с шагом 0.5 градуса, затем уточнение с шагом 0.1
+    angle = estimate_skew(ink)
+    angle = estimate_skew(ink, angles=np.arange(angle - 0.4, angle + 0.41, 0.1))
+    angle = round(angle, 1)
+    if angle:
+        gray = np.asarray(gray_image.rotate(angle, resample=Image.Resampling.BILINEAR, fillcolor=255))
+    return gray
+
+
+def find_lines(ink, axis, min_fill=0.5):
+    """Находит центры линий сетки вдоль оси по доле темных пикселей."""
+    profile = ink.mean(axis=axis)
+    is_line = profile >= min_fill * profile.max() if profile.max() > 0 else np.zeros_like(profile, dtype=bool)
+    # Склеиваем соседние строки/колонки в одну линию
+    edges = np.diff(np.concatenate(([0], is_line.astype(np.int8), [0])))
+    starts, ends = np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]
+    return [(start, end) for start, end in zip(starts, ends)]
+
+
+def segment_cells(ink):
+    """Возвращает границы строк и колонок таблицы как пары (начало, конец) между линиями."""
+    rows = find_lines(ink, axis=1)
+    columns = find_lines(ink, axis=0)
+    row_bands = [(rows[i][1], rows[i + 1][0]) for i in range(len(rows) - 1) if rows[i + 1][0] - rows[i][1] > 4]
+    column_bands = [(columns[i][1], columns[i + 1][0]) for i in range(len(columns) - 1)
+                    if columns[i + 1][0] - columns[i][1] > 4]
+    return row_bands, column_bands
+
+
+def extract_glyphs(cell):
+    """Вырезает цифры из ячейки слева направо и нормализует их размер."""
+    height, width = cell.shape
+    margin_y, margin_x = max(1, height // 10), max(1, width // 20)
+    cell = cell[margin_y:height - margin_y, margin_x:width - margin_x]
+
+    columns = cell.any(axis=0)
+    edges = np.diff(np.concatenate(([0], columns.astype(np.int8), [0])))
+    starts, ends = np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]
+
+    glyphs = []
+    for start, end in zip(starts, ends):
+        glyph = cell[:, start:end]
+        ink_rows = np.nonzero(glyph.any(axis=1))[0]
+        if glyph.sum() < 4:
+            continue
+        glyphs.append(normalize_glyph(glyph[ink_rows[0]:ink_rows[-1] + 1]))
+    return glyphs
+
+
+def normalize_glyph(glyph):
+    """Масштабирует маску цифры до GLYPH_SHAPE с усреднением по площади."""
+    height, width = glyph.shape
+    out_height, out_width = GLYPH_SHAPE
+    # Узкие цифры (единица) центрируем, не растягивая по ширине
+    scale = min(out_height / height, out_width / width)
+    scaled_width = max(1, round(width * scale))
+    scaled_height = max(1, round(height * scale))
+    scaled = Image.fromarray(glyph.astype(np.uint8) * 255).resize((scaled_width, scaled_height), Image.Resampling.BOX)
+    result = np.zeros(GLYPH_SHAPE, dtype=np.float32)
+    top, left = (out_height - scaled_height) // 2, (out_width - scaled_width) // 2
+    result[top:top + scaled_height, left:left + scaled_width] = np.asarray(scaled, dtype=np.float32) / 255
+    return result
+
+
+def _normalize_rows(vectors):
+    vectors = vectors - vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+class DigitMatcher:
+    """Сопоставление цифр с шаблонами через одну матричную операцию на всю пачку."""
+
+    def __init__(self, templates, labels):
+        self.templates = _normalize_rows(np.asarray(templates, dtype=np.float32).reshape(len(labels), -1))
+        self.labels = np.asarray(labels)
+
+    @classmethod
+    def default(cls, sizes=(28, 40, 56)):
+        """Шаблоны, отрисованные встроенным шрифтом Pillow в нескольких размерах."""
+        templates, labels = [], []
+        for size in sizes:
+            try:
+                font = ImageFont.load_default(size=size)
+            except TypeError:
+                font = ImageFont.load_default()
+            for digit in "0123456789":
+                canvas = Image.new("L", (size * 2, size * 2), 255)
+                ImageDraw.Draw(canvas).text((size // 2, size // 4), digit, fill=0, font=font)
+                ink = np.asarray(canvas) < 128
+                ys, xs = np.nonzero(ink)
+                templates.append(normalize_glyph(ink[ys.min():ys.max() + 1, xs.min():xs.max() + 1]))
+                labels.append(int(digit))
+        return cls(np.stack(templates), labels)
+
+    def match(self, glyphs):
+        """Возвращает распознанные цифры и уверенность для массива (N, высота, ширина)."""
+        if len(glyphs) == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+        scores = _normalize_rows(np.asarray(glyphs, dtype=np.float32).reshape(len(glyphs), -1)) @ self.templates.T
+        best = scores.argmax(axis=1)
+        return self.labels[best], scores[np.arange(len(glyphs)), best]
+
+
+class ScoreSheetRecognizer:
+    """Находит таблицу на листе и считывает итог каждого игрока из последней колонки."""
+
+    def __init__(self, matcher=None, min_confidence=0.3):
+        self.matcher = matcher or DigitMatcher.default()
+        self.min_confidence = min_confidence
+
+    def locate_totals(self, image, players_count):
+        """Предобработка одного листа: возвращает список цифр (глифов) для каждого игрока."""
+        ink = binarize(deskew(to_gray(image)))
+        row_bands, column_bands = segment_cells(ink)
+        if not column_bands or len(row_bands) < players_count:
+            raise ValueError("не удалось найти таблицу результатов")
+
+        # Первая строка - заголовок, если строк больше, чем игроков
+        if len(row_bands) > players_count:
+            row_bands = row_bands[1:]
+        left, right = column_bands[-1]
+        return [extract_glyphs(ink[top:bottom, left:right]) for top, bottom in row_bands[:players_count]]
+
+    def recognize_batch(self, images, players_count):
+        """Распознает пачку листов; сопоставление всех цифр пачки выполняется одним умножением матриц."""
+        layouts = []
+        glyphs = []
+        for image in images:
+            try:
+                cells = self.locate_totals(image, players_count)
+            except ValueError:
+                layouts.append(None)
+                continue
+            layouts.append([len(cell) for cell in cells])
+            for cell in cells:
+                glyphs.extend(cell)
+
+        digits, confidence = self.matcher.match(np.stack(glyphs) if glyphs else [])
+
+        results = []
+        position = 0
+        for layout in layouts:
+            if layout is None:
+                results.append([None] * players_count)
+                continue
+            scores = []
+            for count in layout:
+                cell_digits = digits[position:position + count]
+                cell_confidence = confidence[position:position + count]
+                position += count
+                if count == 0 or cell_confidence.min() < self.min_confidence:
+                    scores.append(None)
+                else:
+                    scores.append(int("".join(str(d) for d in cell_digits)))
+            results.append(scores)
+        return results
+
+    def recognize(self, image, players_count):
+        return self.recognize_batch([image], players_count)[0]
+
+
+def measure_throughput(recognizer, images, players_count):
+    """Возвращает скорость распознавания в изображениях в секунду."""
+    started = time.perf_counter()
+    recognizer.recognize_batch(images, players_count)
+    return len(images) / max(time.perf_counter() - started, 1e-9)
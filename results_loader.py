@@ -0,0 +1,90 @@
+import json
+import os
+
+JSON_WHITESPACE = " \t\r\n"
+
+
+class GameReader:
+    """Потоково читает игры из result.json (массив JSON) или JSON Lines (.jsonl).
+
+    Файл читается блоками, в памяти одновременно находится только один блок,
+    поэтому размер истории не ограничен объемом памяти.
+    """
+
+    def __init__(self, json_file_path, block_size=1 << 16):
+        self.json_file_path = json_file_path
+        self.block_size = block_size
+        self.total_bytes = os.path.getsize(json_file_path)
+        self.bytes_read = 0
+        self.json_lines = json_file_path.lower().endswith((".jsonl", ".ndjson"))
+
+    @property
+    def progress(self):
+        return self.bytes_read / self.total_bytes if self.total_bytes else 1.0
+
+    def __iter__(self):
+        if self.json_lines:
+            return self._iter_json_lines()
+        return self._iter_json_array()
+
+    def _iter_json_lines(self):
+        with open(self.json_file_path, "rb") as f:
+            for line in f:
+                self.bytes_read += len(line)
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def _iter_json_array(self):
+        decoder = json.JSONDecoder()
+        with open(self.json_file_path, "r", encoding="utf-8") as f:
+            buffer = ""
+            position = 0
+            started = False
+            eof = False
+            while True:
+                # Пропускаем пробелы и разделители между элементами
+                while position < len(buffer) and (buffer[position] in JSON_WHITESPACE or
+                                                  (started and buffer[position] == ",")):
+                    position += 1
+
+                if position >= len(buffer):
+                    if eof:
+                        if not started:
+                            raise json.JSONDecodeError("Ожидался массив игр", buffer, position)
+                        raise json.JSONDecodeError("Неожиданный конец файла", buffer, position)
+                    buffer, position, eof = self._read_more(f, buffer, position)
+                    continue
+
+                if not started:
+                    if buffer[position] != "[":
+                        raise json.JSONDecodeError("Ожидался массив игр", buffer, position)
+                    started = True
+                    position += 1
+                    continue
+
+                if buffer[position] == "]":
+                    self.bytes_read = self.total_bytes
+                    return
+
+                try:
+                    game, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # Элемент не поместился в блок: дочитываем и пробуем снова
+                    if eof:
+                        raise
+                    buffer, position, eof = self._read_more(f, buffer, position)
+                    continue
+
+                # Число на границе блока могло быть прочитано не полностью
+                if end == len(buffer) and not eof:
+                    buffer, position, eof = self._read_more(f, buffer, position)
+                    continue
+
+                position = end
+                yield game
+
+    def _read_more(self, f, buffer, position):
+        block = f.read(self.block_size)
+        self.bytes_read = min(self.total_bytes, self.bytes_read + len(block.encode("utf-8")))
+        return buffer[position:] + block, 0, not block
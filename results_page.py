@@ -1,10 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import json
-import openpyxl
-import csv
-import matplotlib.pyplot as plt
-from openpyxl.styles import Font, Alignment, Side, Border, PatternFill, numbers
+import sqlite3
+import time
+
+from export_jobs import ExportScheduler
+from incremental_stats import IncrementalStats, ROLLING_WINDOW
+from instrumentation import fields, get_logger, span
+from name_resolver import NameResolver
+from results_loader import GameReader
+from score_store import ScoreStore, format_player_scores
+from sqlite_store import DatabaseGameReader, ResultsDatabase, is_database_path
+
+CSV_FILE = "game_results.csv"
+XLSX_FILE = "game_results.xlsx"
+PNG_FILE = "player_results.png"
+
+PAGE_SIZE = 500  # строк в таблице одновременно
+LOAD_CHUNK = 2000  # игр, читаемых за один вызов after()
+
+logger = get_logger("results_page")
 
 
 class ResultsPage(tk.Frame):
@@ -18,6 +33,30 @@ class ResultsPage(tk.Frame):
         self.table.heading("player_scores", text="Очки игроков")
         self.table.pack(fill=tk.BOTH, expand=True)
 
+        # Текущая статистика игроков; при добавлении игры обновляются только ее участники
+        stats_columns = ("player", "count", "total", "mean", "std", "best", "worst", "rolling")
+        self.stats_table = ttk.Treeview(self, columns=stats_columns, show="headings", height=6)
+        for column, title in zip(stats_columns, ("Игрок", "Игр", "Общий счет", "Среднее", "Ст. откл.", "Лучший",
+                                                  "Худший", f"Среднее за {ROLLING_WINDOW}")):
+            self.stats_table.heading(column, text=title)
+            self.stats_table.column(column, width=90, anchor="center")
+        self.stats_table.pack(fill=tk.X, pady=(5, 0))
+
+        # Постраничная навигация и ход загрузки
+        self.status_frame = tk.Frame(self)
+        self.status_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+
+        self.prev_page_button = tk.Button(self.status_frame, text="<", command=lambda: self.show_page(self.page - 1))
+        self.prev_page_button.pack(side=tk.LEFT)
+        self.next_page_button = tk.Button(self.status_frame, text=">", command=lambda: self.show_page(self.page + 1))
+        self.next_page_button.pack(side=tk.LEFT, padx=5)
+
+        self.status_label = tk.Label(self.status_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+        self.load_progress = ttk.Progressbar(self.status_frame, maximum=1.0, length=200)
+        self.load_progress.pack(side=tk.RIGHT)
+
         # Кнопки
         self.back_button = tk.Button(self, text="Вернуться", command=self.go_back)
         self.back_button.pack(side=tk.LEFT, padx=5, pady=10)
@@ -28,126 +67,314 @@ class ResultsPage(tk.Frame):
         self.plot_graph_button = tk.Button(self, text="Построить график", command=self.plot_graph)
         self.plot_graph_button.pack(side=tk.LEFT, padx=5, pady=10)
 
-        # JSON данные
-        self.json_data = []
+        self.save_png_button = tk.Button(self, text="Сохранить график", command=self.save_graph)
+        self.save_png_button.pack(side=tk.LEFT, padx=5, pady=10)
+
+        self.export_all_button = tk.Button(self, text="Экспортировать все", command=self.export_all)
+        self.export_all_button.pack(side=tk.LEFT, padx=5, pady=10)
+
+        # Ход фоновых экспортов: строка с прогрессом и кнопкой отмены на каждую задачу
+        self.jobs_frame = tk.Frame(self)
+        self.jobs_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, before=self.status_frame)
+        self.job_rows = {}
+        self.export_scheduler = ExportScheduler(self, self.update_job_row)
+
+        # Встроенный график создается при первом нажатии "Построить график"
+        self.chart = None
+
+        # Результаты в колоночном виде; агрегаты общие для таблицы, CSV и графика
+        self.store = ScoreStore()
+        self.stats = IncrementalStats()
+
+        # Разные написания одного игрока ("Игрок 1", "игрок1", псевдонимы) считаются вместе
+        self.name_resolver = NameResolver()
+
+        # Состояние постраничной загрузки
+        self.page = 0
+        self.reader = None
+        self.games_iter = None
+        self.load_id = None
+        self.load_started = None
+
+        # Игры, пришедшие во время загрузки; добавляются после нее, см. append_game
+        self.pending_games = []
+
+        # База SQLite, если результаты открыты из нее: страницы таблицы читаются запросами
+        self.database = None
+
+        # Виджеты родителя, скрытые на время показа результатов, и их параметры pack
+        self.hidden_widgets = []
+
+    def show(self):
+        """Скрывает содержимое родительского окна и показывает страницу результатов."""
+        for widget in self.parent.pack_slaves():
+            if widget is not self:
+                self.hidden_widgets.append((widget, widget.pack_info()))
+                widget.pack_forget()
+        self.pack(fill=tk.BOTH, expand=True)
+
+    def _reset(self):
+        """Прерывает загрузку и очищает результаты перед показом нового источника."""
+        if self.load_id is not None:
+            self.after_cancel(self.load_id)
+            self.load_id = None
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+        self.reader = None
+        self.games_iter = None
+        self.pending_games.clear()
+        self.store.clear()
+        self.stats.clear()
+        self.name_resolver = NameResolver.from_players_file()
+        self.stats_table.delete(*self.stats_table.get_children())
+        self.page = 0
+
+    def start_live(self):
+        """Показывает пустые результаты, в которые игры добавляются через append_game по мере распознавания."""
+        logger.info("Результаты по мере распознавания")
+        self._reset()
+        self.load_progress["value"] = 1.0
+        self.show_page(0)
 
     def display_results(self, json_file_path):
-        """Загружает данные из JSON и отображает их в таблице."""
-        print(f"Загружаем данные из файла: {json_file_path}")
-        self.json_data = self.load_json(json_file_path)
+        """Загружает данные из JSON или базы SQLite по частям и постранично отображает их в таблице."""
+        logger.info("Загрузка результатов", extra=fields(path=json_file_path))
+        self.load_started = time.perf_counter()
+        self._reset()
+        try:
+            if is_database_path(json_file_path):
+                # Первая страница берется запросом сразу, хранилище для агрегатов заполняется в фоне
+                self.database = ResultsDatabase(json_file_path)
+                self.reader = DatabaseGameReader(self.database)
+            else:
+                self.reader = GameReader(json_file_path)
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить JSON-файл: {e}")
+            return
+        self.show_page(0)
+        self.games_iter = iter(self.reader)
+        self.load_id = self.after(0, self._load_chunk)
+
+    def _load_chunk(self):
+        """Читает очередную порцию игр, не блокируя окно."""
+        self.load_id = None
+        first_new = self.store.games_count
+        updated = set()
+        try:
+            with span("load", "ResultsPage._load_chunk", first_game=first_new):
+                for _ in range(LOAD_CHUNK):
+                    game = self.name_resolver.resolve_game(next(self.games_iter))
+                    self.store.append_game(game)
+                    updated.update(self.stats.add_game(game))
+        except StopIteration:
+            self.games_iter = None
+            logger.info("Результаты загружены", extra=fields(
+                games=self.store.games_count, seconds=round(time.perf_counter() - self.load_started, 2)))
+        except (OSError, sqlite3.Error, json.JSONDecodeError) as e:
+            self.games_iter = None
+            logger.error("Не удалось загрузить результаты: %s", e)
+            messagebox.showerror("Ошибка", f"Не удалось загрузить JSON-файл: {e}")
+
+        # Новые игры дописываются в таблицу, только если попадают на текущую страницу
+        if self.database is None:
+            page_end = min((self.page + 1) * PAGE_SIZE, self.store.games_count)
+            for index in range(max(first_new, self.page * PAGE_SIZE), page_end):
+                self._insert_game(*self.store.game(index))
 
-        # Очищаем таблицу
-        for row in self.table.get_children():
-            self.table.delete(row)
+        self.load_progress["value"] = self.reader.progress if self.games_iter is not None else 1.0
+        self._update_stats_rows(updated)
+        self._update_status()
+        if self.games_iter is not None:
+            self.load_id = self.after(1, self._load_chunk)
+        else:
+            pending, self.pending_games = self.pending_games, []
+            for game in pending:
+                self.append_game(game)
 
-        # Добавляем данные в таблицу
-        for game in self.json_data:
-            game_number = game.get("game_number")
-            player_scores = ", ".join([f"{player['player_name']}: {player['result']}" for player in game["players"]])
-            self.table.insert("", "end", values=(game_number, player_scores))
+    def append_game(self, game):
+        """Добавляет одну новую игру без перезагрузки: обновляются только ее строки и точки.
+
+        Пока идет загрузка, игра откладывается до ее конца: ее номер в хранилище
+        еще неизвестен, а в режиме SQLite вставка на том же соединении попала бы
+        в читаемую выборку, и игра была бы учтена дважды.
+        """
+        if self.games_iter is not None:
+            self.pending_games.append(game)
+            return
+
+        index = self.store.games_count
+        if self.database is not None:
+            self.database.add_game(game)
+            self.database.connection.commit()
+            self.reader.total += 1
+        game = self.name_resolver.resolve_game(game)
+        self.store.append_game(game)
+        updated = self.stats.add_game(game)
+
+        # Строка попадает в таблицу, только если новая игра на текущей странице
+        if self.page * PAGE_SIZE <= index < (self.page + 1) * PAGE_SIZE:
+            game_number, players = self.store.game(index)
+            self._insert_game(game_number, players)
+
+        if self.chart is not None:
+            for player in game["players"]:
+                if player["result"] is not None:
+                    self.chart.append_point(player["player_name"], index + 1, player["result"])
+
+        self._update_stats_rows(updated)
+        self._update_status()
+
+    def _update_stats_rows(self, player_names):
+        """Обновляет в таблице статистики строки перечисленных игроков."""
+        for player_name in player_names:
+            stats = self.stats.players[player_name]
+            values = (player_name, stats.count, stats.total, round(stats.mean, 2), round(stats.std, 2),
+                      stats.best, stats.worst, round(stats.rolling_mean, 2))
+            if self.stats_table.exists(player_name):
+                self.stats_table.item(player_name, values=values)
+            else:
+                self.stats_table.insert("", "end", iid=player_name, values=values)
+
+    def games_total(self):
+        if self.database is not None:
+            return self.reader.total
+        return self.store.games_count
+
+    def show_page(self, page):
+        """Показывает страницу таблицы; в Treeview одновременно не больше PAGE_SIZE строк."""
+        pages_count = max(1, -(-self.games_total() // PAGE_SIZE))
+        self.page = max(0, min(page, pages_count - 1))
+
+        self.table.delete(*self.table.get_children())
+        if self.database is not None:
+            for game_number, players in self.database.games_page(self.page * PAGE_SIZE, PAGE_SIZE):
+                resolve = self.name_resolver.resolve
+                self._insert_game(game_number, [(resolve(player_name), score) for player_name, score in players])
+        else:
+            for index in range(self.page * PAGE_SIZE, min((self.page + 1) * PAGE_SIZE, self.store.games_count)):
+                self._insert_game(*self.store.game(index))
+        self._update_status()
+
+    def _insert_game(self, game_number, players):
+        self.table.insert("", "end", values=(game_number, format_player_scores(players)))
+
+    def _update_status(self):
+        pages_count = max(1, -(-self.games_total() // PAGE_SIZE))
+        loading = " (загрузка...)" if self.games_iter is not None else ""
+        self.status_label.config(
+            text=f"Страница {self.page + 1} из {pages_count}, игр: {self.games_total()}{loading}")
 
     def load_json(self, json_file_path):
-        """Загружает данные из JSON-файла."""
+        """Загружает данные из JSON-файла (массив или JSON Lines)."""
         try:
-            with open(json_file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            print(f"Данные из JSON: {data}")
+            with span("load", "ResultsPage.load_json"):
+                data = list(GameReader(json_file_path))
+            logger.info("Загружено игр из JSON", extra=fields(path=json_file_path, games=len(data)))
             return data
         except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.error("Не удалось загрузить JSON-файл: %s", e)
             messagebox.showerror("Ошибка", f"Не удалось загрузить JSON-файл: {e}")
             return []
 
     def save_to_csv(self):
-        """Сохраняет данные из JSON в CSV-файл."""
-        try:
-            # Создаем CSV файл для записи
-            with open("game_results.csv", "w", newline="", encoding="utf-8") as csvfile:
-                csvwriter = csv.writer(csvfile)
-
-                # Заголовок таблицы 1: Результаты игр
-                csvwriter.writerow(["Номер игры", "Очки игроков"])
-
-                # Записываем данные из JSON
-                for game in self.json_data:
-                    game_number = game.get("game_number")
-                    player_scores = ", ".join(
-                        [f"{player['player_name']}: {player['result']}" for player in game["players"]]
-                    )
-                    csvwriter.writerow([game_number, player_scores])
-
-                # Пустая строка для разделения листов
-                csvwriter.writerow([])
-
-                # Заголовок таблицы 2: Общий счет и Среднее значение каждого игрока
-                csvwriter.writerow(["Игрок", "Общий счет", "Среднее значение"])
-
-                # Собираем данные по игрокам
-                player_totals = {}  # Словарь для хранения общего счета каждого игрока
-                player_counts = {}  # Словарь для подсчета количества игр каждого игрока
-
-                for game in self.json_data:
-                    for player in game["players"]:
-                        player_name = player["player_name"]
-                        score = player["result"]
-
-                        if player_name not in player_totals:
-                            player_totals[player_name] = 0
-                            player_counts[player_name] = 0
-
-                        player_totals[player_name] += score
-                        player_counts[player_name] += 1
-
-                # Записываем данные о каждом игроке
-                for player_name in player_totals:
-                    total_score = player_totals[player_name]
-                    average_score = total_score / player_counts[player_name]
-                    csvwriter.writerow([player_name, total_score, round(average_score, 2)])
-
-            # Уведомляем об успешном сохранении
-            messagebox.showinfo("Успех", "Данные успешно сохранены в CSV!")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сохранить в CSV: {e}")
+        """Сохраняет данные в CSV-файл в фоне."""
+        from exporters import write_csv
+
+        self.start_export("CSV", write_csv, CSV_FILE)
+
+    def save_to_excel(self):
+        """Сохраняет игры и итоги по игрокам в XLSX-файл в фоне."""
+        # openpyxl и matplotlib загружаются только при первом экспорте
+        from exporters import write_excel
+
+        self.start_export("Excel", write_excel, XLSX_FILE)
 
     def plot_graph(self):
-        """Строит график результатов и сохраняет его в .png."""
-        try:
-            # Убедимся, что данные из JSON загружены
-            if not self.json_data:
-                messagebox.showerror("Ошибка", "Нет данных для построения графика.")
-                return
-
-            # Собираем данные для построения графика
-            players = {}
-            for game in self.json_data:
-                for player in game["players"]:
-                    player_name = player["player_name"]
-                    score = player["result"]
-                    if player_name not in players:
-                        players[player_name] = []
-                    players[player_name].append(score)
-
-            # Строим график
-            plt.figure(figsize=(10, 6))
-            for player_name, scores in players.items():
-                plt.plot(range(1, len(scores) + 1), scores, label=player_name, marker='o')
-
-            # Настройки графика
-            plt.xlabel("Номер игры")
-            plt.ylabel("Баллы")
-            plt.title("Результативность игроков")
-            plt.legend()
-            plt.grid(True)
-
-            # Сохраняем график в .png
-            plt.savefig("player_results.png")
-            plt.close()
-            # Логика построения графика
-            messagebox.showinfo("Успех", "График успешно построен и сохранен!")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось построить график: {e}")
+        """Показывает график результатов внутри окна."""
+        if not self.store.games_count:
+            messagebox.showerror("Ошибка", "Нет данных для построения графика.")
+            return
+
+        with span("plot", "ResultsPage.plot_graph", games=self.store.games_count):
+            if self.chart is None:
+                from chart import ChartPanel
+
+                self.chart = ChartPanel(self)
+                self.chart.pack(fill=tk.BOTH, expand=True, before=self.status_frame)
+
+            series = {}
+            for player_id, player_name in enumerate(self.store.names):
+                game_index, scores = self.store.series(player_id)
+                if len(scores):
+                    series[player_name] = (game_index + 1, scores)
+            self.chart.set_data(series)
+
+    def save_graph(self):
+        """Сохраняет график результатов в .png в фоне."""
+        from exporters import write_png
+
+        self.start_export("График", write_png, PNG_FILE)
+
+    def export_all(self):
+        """Запускает CSV, XLSX и PNG параллельно над одним снимком данных."""
+        if not self.store.games_count:
+            messagebox.showerror("Ошибка", "Нет данных для экспорта.")
+            return
+        from exporters import write_csv, write_excel, write_png
+
+        snapshot = self.store.snapshot()
+        for name, export_function, file_path in (("CSV", write_csv, CSV_FILE), ("Excel", write_excel, XLSX_FILE),
+                                                 ("График", write_png, PNG_FILE)):
+            self.export_scheduler.submit(name, export_function, snapshot, file_path)
+
+    def start_export(self, name, export_function, file_path):
+        if not self.store.games_count:
+            messagebox.showerror("Ошибка", "Нет данных для экспорта.")
+            return
+        # Снимок не меняется, пока загрузка продолжает дописывать игры в self.store
+        self.export_scheduler.submit(name, export_function, self.store.snapshot(), file_path)
+
+    def update_job_row(self, job):
+        """Обновляет строку задачи экспорта в панели прогресса."""
+        row = self.job_rows.get(job)
+        if row is None:
+            frame = tk.Frame(self.jobs_frame)
+            frame.pack(fill=tk.X)
+            label = tk.Label(frame, anchor="w", width=40)
+            label.pack(side=tk.LEFT)
+            progress = ttk.Progressbar(frame, maximum=1.0, length=200)
+            progress.pack(side=tk.LEFT, padx=5)
+            cancel_button = tk.Button(frame, text="Отмена", command=job.cancel)
+            cancel_button.pack(side=tk.LEFT)
+            row = self.job_rows[job] = (frame, label, progress, cancel_button)
+
+        frame, label, progress, cancel_button = row
+        label.config(text=f"{job.name} ({job.file_path}): {job.state}")
+        progress["value"] = job.progress
+        if job.done:
+            cancel_button.config(state=tk.DISABLED)
+            if job.error is not None:
+                messagebox.showerror("Ошибка", f"Не удалось выполнить экспорт ({job.name}): {job.error}")
+            # Завершенная строка остается на экране несколько секунд
+            self.after(5000, self._remove_job_row, job)
+
+    def _remove_job_row(self, job):
+        row = self.job_rows.pop(job, None)
+        if row is not None:
+            row[0].destroy()
 
     def go_back(self):
         """Возвращает на главную страницу."""
+        self.export_scheduler.shutdown()
+        if self.load_id is not None:
+            self.after_cancel(self.load_id)
+        if self.database is not None:
+            self.database.close()
         self.pack_forget()
-        for widget in self.parent.winfo_children():
-            widget.pack()
+        for widget, pack_info in self.hidden_widgets:
+            pack_info.pop("in", None)
+            widget.pack(**pack_info)
+        self.hidden_widgets = []
+        self.destroy()
@@ -0,0 +1,218 @@
+import math
+
+import numpy as np
+
+
+def format_score(score):
+    """Приводит очки к виду из result.json: целые как int, NaN как None."""
+    if math.isnan(score):
+        return None
+    return int(score) if score.is_integer() else score
+
+
+def format_player_scores(players):
+    """Форматирует очки игры для таблицы и CSV: "Имя: очки, ..."."""
+    return ", ".join([f"{player_name}: {score}" for player_name, score in players])
+
+
+class ScoreStore:
+    """Колоночное хранилище результатов: по строке на каждое (игра, игрок, очки).
+
+    Имена игроков интернированы в целочисленные id. Агрегаты считаются
+    векторно и кэшируются до следующего изменения данных.
+    """
+
+    def __init__(self, capacity=1024):
+        self.names = []
+        self.name_ids = {}
+
+        self._game_numbers = np.empty(capacity, dtype=np.int64)
+        self._game_offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._player_ids = np.empty(capacity * 4, dtype=np.int32)
+        self._scores = np.empty(capacity * 4, dtype=np.float64)
+
+        self.games_count = 0
+        self.rows_count = 0
+        self.version = 0
+        self._cache = {}
+
+    # Заполнение
+
+    def intern(self, player_name):
+        """Возвращает id игрока, при необходимости добавляя его в таблицу имен."""
+        player_id = self.name_ids.get(player_name)
+        if player_id is None:
+            player_id = len(self.names)
+            self.name_ids[player_name] = player_id
+            self.names.append(player_name)
+        return player_id
+
+    def append_game(self, game):
+        """Добавляет игру в формате result.json."""
+        players = game["players"]
+        self._reserve(self.games_count + 1, self.rows_count + len(players))
+
+        game_number = game.get("game_number")
+        self._game_numbers[self.games_count] = -1 if game_number is None else game_number
+        for player in players:
+            score = player["result"]
+            self._player_ids[self.rows_count] = self.intern(player["player_name"])
+            # Нераспознанные очки хранятся как NaN и не участвуют в агрегатах
+            self._scores[self.rows_count] = np.nan if score is None else score
+            self.rows_count += 1
+        self.games_count += 1
+        self._game_offsets[self.games_count] = self.rows_count
+        self._invalidate()
+
+    def extend(self, games):
+        for game in games:
+            self.append_game(game)
+
+    def clear(self):
+        self.names = []
+        self.name_ids = {}
+        self.games_count = 0
+        self.rows_count = 0
+        self._invalidate()
+
+    def _reserve(self, games_count, rows_count):
+        if games_count > len(self._game_numbers):
+            capacity = max(games_count, len(self._game_numbers) * 2)
+            self._game_numbers = np.resize(self._game_numbers, capacity)
+            self._game_offsets = np.resize(self._game_offsets, capacity + 1)
+        if rows_count > len(self._scores):
+            capacity = max(rows_count, len(self._scores) * 2)
+            self._player_ids = np.resize(self._player_ids, capacity)
+            self._scores = np.resize(self._scores, capacity)
+
+    def _invalidate(self):
+        self.version += 1
+        self._cache.clear()
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    # Колонки
+
+    @property
+    def game_numbers(self):
+        return self._game_numbers[:self.games_count]
+
+    @property
+    def player_ids(self):
+        return self._player_ids[:self.rows_count]
+
+    @property
+    def scores(self):
+        return self._scores[:self.rows_count]
+
+    @property
+    def game_index(self):
+        """Порядковый номер игры для каждой строки."""
+        return self._cached("game_index", lambda: np.repeat(
+            np.arange(self.games_count), np.diff(self._game_offsets[:self.games_count + 1])))
+
+    def game(self, index):
+        """Возвращает номер игры и список (имя, очки) для одной игры."""
+        start, end = self._game_offsets[index], self._game_offsets[index + 1]
+        game_number = int(self._game_numbers[index])
+        players = [(self.names[player_id], format_score(score))
+                   for player_id, score in zip(self._player_ids[start:end].tolist(), self._scores[start:end].tolist())]
+        return (None if game_number == -1 else game_number), players
+
+    def iter_games(self):
+        for index in range(self.games_count):
+            yield self.game(index)
+
+    def iter_game_rows(self):
+        """Для каждой игры отдает номер, id игроков и очки (NaN для нераспознанных)."""
+        offsets = self._game_offsets[:self.games_count + 1].tolist()
+        game_numbers = self.game_numbers.tolist()
+        for index, game_number in enumerate(game_numbers):
+            start, end = offsets[index], offsets[index + 1]
+            yield ((None if game_number == -1 else game_number),
+                   self._player_ids[start:end].tolist(), self._scores[start:end].tolist())
+
+    # Агрегаты по игрокам (массивы, индексированные id игрока)
+
+    def _valid(self):
+        def compute():
+            valid = ~np.isnan(self.scores)
+            return self.player_ids[valid], self.scores[valid], self.game_index[valid]
+        return self._cached("valid", compute)
+
+    def counts(self):
+        return self._cached("counts", lambda: np.bincount(self._valid()[0], minlength=len(self.names)))
+
+    def totals(self):
+        def compute():
+            player_ids, scores, _ = self._valid()
+            return np.bincount(player_ids, weights=scores, minlength=len(self.names))
+        return self._cached("totals", compute)
+
+    def means(self):
+        def compute():
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return self.totals() / self.counts()
+        return self._cached("means", compute)
+
+    def stds(self):
+        def compute():
+            player_ids, scores, _ = self._valid()
+            squares = np.bincount(player_ids, weights=scores * scores, minlength=len(self.names))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                variance = squares / self.counts() - self.means() ** 2
+            return np.sqrt(np.maximum(variance, 0))
+        return self._cached("stds", compute)
+
+    def mins(self):
+        def compute():
+            player_ids, scores, _ = self._valid()
+            result = np.full(len(self.names), np.inf)
+            np.minimum.at(result, player_ids, scores)
+            return result
+        return self._cached("mins", compute)
+
+    def maxs(self):
+        def compute():
+            player_ids, scores, _ = self._valid()
+            result = np.full(len(self.names), -np.inf)
+            np.maximum.at(result, player_ids, scores)
+            return result
+        return self._cached("maxs", compute)
+
+    def series(self, player_id):
+        """Номера игр (по порядку) и очки одного игрока."""
+        def compute():
+            player_ids, scores, game_index = self._valid()
+            order = np.argsort(player_ids, kind="stable")
+            bounds = np.searchsorted(player_ids[order], np.arange(len(self.names) + 1))
+            return order, bounds
+        order, bounds = self._cached("series_index", compute)
+        _, scores, game_index = self._valid()
+        rows = order[bounds[player_id]:bounds[player_id + 1]]
+        return game_index[rows], scores[rows]
+
+    def rolling_mean(self, player_id, window):
+        """Скользящее среднее по последним window играм игрока."""
+        def compute():
+            _, scores = self.series(player_id)
+            cumulative = np.concatenate(([0.0], np.cumsum(scores)))
+            lengths = np.minimum(np.arange(1, len(scores) + 1), window)
+            return (cumulative[1:] - cumulative[np.arange(1, len(scores) + 1) - lengths]) / lengths
+        return self._cached(("rolling_mean", player_id, window), compute)
+
+    def snapshot(self):
+        """Независимая копия данных, которую можно читать из другого потока."""
+        copy = ScoreStore(capacity=max(1, self.games_count))
+        copy.names = list(self.names)
+        copy.name_ids = dict(self.name_ids)
+        copy._game_numbers = self.game_numbers.copy()
+        copy._game_offsets = self._game_offsets[:self.games_count + 1].copy()
+        copy._player_ids = self.player_ids.copy()
+        copy._scores = self.scores.copy()
+        copy.games_count = self.games_count
+        copy.rows_count = self.rows_count
+        return copy
@@ -0,0 +1,224 @@
+"""Хранилище результатов и игроков в SQLite.
+
+Пример:
+    python sqlite_store.py import-results result.json league.db
+    python sqlite_store.py import-players players.json league.db
+    python sqlite_store.py export-results league.db result.json
+"""
+import argparse
+import json
+import sqlite3
+import sys
+
+from players import PLAYERS_FILE, load_player_names, save_player_names
+from results_loader import GameReader
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    game_number INTEGER,
+    image TEXT
+);
+CREATE TABLE IF NOT EXISTS scores (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    position INTEGER NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    result INTEGER,
+    PRIMARY KEY (game_id, position)
+);
+CREATE INDEX IF NOT EXISTS scores_player ON scores (player_id, game_id);
+CREATE INDEX IF NOT EXISTS games_number ON games (game_number);
+"""
+
+DATABASE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+IMPORT_BATCH = 5000
+
+
+def is_database_path(file_path):
+    return file_path.lower().endswith(DATABASE_EXTENSIONS)
+
+
+class ResultsDatabase:
+    """Игры, игроки и очки в SQLite с индексами по игроку и номеру игры."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(SCHEMA)
+        self.player_ids = dict(self.connection.execute("SELECT name, id FROM players"))
+
+    def close(self):
+        self.connection.close()
+
+    # Запись
+
+    def player_id(self, player_name):
+        player_id = self.player_ids.get(player_name)
+        if player_id is None:
+            player_id = self.connection.execute("INSERT INTO players (name) VALUES (?)", (player_name,)).lastrowid
+            self.player_ids[player_name] = player_id
+        return player_id
+
+    def add_game(self, game):
+        """Добавляет игру в формате result.json (без фиксации транзакции)."""
+        game_id = self.connection.execute(
+            "INSERT INTO games (game_number, image) VALUES (?, ?)", (game.get("game_number"), game.get("image"))
+        ).lastrowid
+        self.connection.executemany(
+            "INSERT INTO scores (game_id, position, player_id, result) VALUES (?, ?, ?, ?)",
+            [(game_id, position, self.player_id(player["player_name"]), player["result"])
+             for position, player in enumerate(game["players"])],
+        )
+        return game_id
+
+    def import_results_json(self, json_file_path):
+        """Потоково импортирует result.json (или .jsonl); возвращает число игр."""
+        count = 0
+        with self.connection:
+            for game in GameReader(json_file_path):
+                self.add_game(game)
+                count += 1
+                if count % IMPORT_BATCH == 0:
+                    self.connection.commit()
+        return count
+
+    def import_players_json(self, json_file_path=PLAYERS_FILE):
+        with self.connection:
+            for player_name in load_player_names(json_file_path):
+                self.player_id(player_name)
+
+    # Чтение
+
+    def games_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def player_names(self):
+        return [name for name, in self.connection.execute("SELECT name FROM players ORDER BY id")]
+
+    def _games(self, where, parameters, offset, limit):
+        """Игры страницы в виде [(номер игры, [(имя, очки), ...]), ...] одним запросом."""
+        rows = self.connection.execute(
+            f"""
+            WITH page AS (SELECT id, game_number FROM games {where} ORDER BY id LIMIT ? OFFSET ?)
+            SELECT page.id, page.game_number, players.name, scores.result
+            FROM page
+            LEFT JOIN scores ON scores.game_id = page.id
+            LEFT JOIN players ON players.id = scores.player_id
+            ORDER BY page.id, scores.position
+            """,
+            (*parameters, limit, offset),
+        )
+        # LEFT JOIN: игра без очков тоже попадает на страницу, одной строкой с NULL вместо игрока
+        games = []
+        last_id = None
+        for game_id, game_number, player_name, result in rows:
+            if game_id != last_id:
+                games.append((game_number, []))
+                last_id = game_id
+            if player_name is not None:
+                games[-1][1].append((player_name, result))
+        return games
+
+    def games_page(self, offset, limit):
+        """Страница игр по порядку добавления."""
+        return self._games("", (), offset, limit)
+
+    def player_games(self, player_name, offset=0, limit=-1):
+        """Все игры, в которых участвовал игрок (по индексу scores_player)."""
+        return self._games(
+            "WHERE id IN (SELECT game_id FROM scores WHERE player_id = (SELECT id FROM players WHERE name = ?))",
+            (player_name,), offset, limit)
+
+    def game_by_number(self, game_number):
+        return self._games("WHERE game_number = ?", (game_number,), 0, -1)
+
+    def iter_games(self):
+        """Отдает игры в формате result.json одним последовательным проходом курсора."""
+        rows = self.connection.execute(
+            """
+            SELECT games.id, games.game_number, games.image, players.name, scores.result
+            FROM games
+            LEFT JOIN scores ON scores.game_id = games.id
+            LEFT JOIN players ON players.id = scores.player_id
+            ORDER BY games.id, scores.position
+            """
+        )
+        game = None
+        last_id = None
+        for game_id, game_number, image, player_name, result in rows:
+            if game_id != last_id:
+                if game is not None:
+                    yield game
+                # Путь к фото нужен batch_cli --resume, чтобы не распознавать его повторно
+                game = {"game_number": game_number}
+                if image is not None:
+                    game["image"] = image
+                game["players"] = []
+                last_id = game_id
+            if player_name is not None:
+                game["players"].append({"player_name": player_name, "result": result})
+        if game is not None:
+            yield game
+
+    # Экспорт
+
+    def export_results_json(self, json_file_path):
+        """Потоково выгружает игры в result.json."""
+        with open(json_file_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for index, game in enumerate(self.iter_games()):
+                f.write(",\n" if index else "\n")
+                json.dump(game, f, ensure_ascii=False)
+            f.write("\n]\n")
+
+    def export_players_json(self, json_file_path=PLAYERS_FILE):
+        save_player_names(self.player_names(), json_file_path)
+
+
+class DatabaseGameReader:
+    """Читает игры из базы с тем же интерфейсом, что и GameReader (итерация и progress)."""
+
+    def __init__(self, database):
+        self.database = database
+        self.total = database.games_count()
+        self.read = 0
+
+    @property
+    def progress(self):
+        return self.read / self.total if self.total else 1.0
+
+    def __iter__(self):
+        for game in self.database.iter_games():
+            self.read += 1
+            yield game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт и экспорт результатов между JSON и SQLite")
+    parser.add_argument("command", choices=["import-results", "import-players", "export-results", "export-players"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args(argv)
+
+    if args.command.startswith("import"):
+        database = ResultsDatabase(args.target)
+        if args.command == "import-results":
+            print(f"Импортировано игр: {database.import_results_json(args.source)}")
+        else:
+            database.import_players_json(args.source)
+    else:
+        database = ResultsDatabase(args.source)
+        if args.command == "export-results":
+            database.export_results_json(args.target)
+        else:
+            database.export_players_json(args.target)
+    database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+
+from PIL import Image, features
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "interface"
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ACCESS_FLUSH_COUNT = 256  # сколько обращений копится до записи last_access в базу
+ACCESS_FLUSH_INTERVAL = 5.0  # и не дольше скольких секунд
+
+
+def cache_key(file_path):
+    """Строит ключ кэша по пути, времени изменения и размеру файла."""
+    stat = os.stat(file_path)
+    raw = f"{os.path.abspath(file_path)}\0{stat.st_mtime_ns}\0{stat.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ThumbnailCache:
+    """Хранилище миниатюр в SQLite с ограничением размера и вытеснением LRU."""
+
+    def __init__(self, db_path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if db_path is None:
+            os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
+            db_path = os.path.join(DEFAULT_CACHE_DIR, "thumbnails.sqlite")
+        self.max_bytes = max_bytes
+        self.format = "WEBP" if features.check("webp") else "PNG"
+
+        # Соединение общее для всех потоков пула, поэтому доступ под блокировкой
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS thumbnails_last_access ON thumbnails (last_access)")
+        self.connection.commit()
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+
+        # Время обращений копится в памяти и пишется в базу пачкой, а не UPDATE и commit на каждое попадание
+        self.accessed = {}  # ключ -> время последнего обращения
+        self.accessed_flushed_at = time.monotonic()
+
+    def get(self, file_path):
+        """Возвращает миниатюру из кэша или None, если ее нет или файл изменился."""
+        key = cache_key(file_path)
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.accessed[key] = time.time()
+            if (len(self.accessed) >= ACCESS_FLUSH_COUNT
+                    or time.monotonic() - self.accessed_flushed_at >= ACCESS_FLUSH_INTERVAL):
+                self._flush_access()
+                self.connection.commit()
+
+        image = Image.open(io.BytesIO(row[0]))
+        image.load()
+        return image
+
+    def put(self, file_path, image):
+        """Сохраняет миниатюру и при необходимости вытесняет давно не использованные."""
+        key = cache_key(file_path)
+        buffer = io.BytesIO()
+        if self.format == "WEBP":
+            image.save(buffer, "WEBP", quality=85, lossless=image.mode in ("1", "P"))
+        else:
+            image.save(buffer, "PNG", optimize=False)
+        data = buffer.getvalue()
+
+        with self.lock:
+            old = self.connection.execute("SELECT size FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self.total_bytes -= old[0]
+            self.connection.execute(
+                "INSERT OR REPLACE INTO thumbnails (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            self.total_bytes += len(data)
+            if self.total_bytes > self.max_bytes:
+                self._flush_access()
+                self._evict()
+            self.connection.commit()
+
+    def _flush_access(self):
+        """Записывает накопленные времена обращений; commit остается за вызывающим."""
+        if self.accessed:
+            self.connection.executemany("UPDATE thumbnails SET last_access = ? WHERE key = ?",
+                                        [(accessed_at, key) for key, accessed_at in self.accessed.items()])
+            self.accessed.clear()
+        self.accessed_flushed_at = time.monotonic()
+
+    def _evict(self):
+        """Удаляет самые старые записи, пока кэш не станет меньше 90% лимита."""
+        target = self.max_bytes * 0.9
+        rows = self.connection.execute("SELECT key, size FROM thumbnails ORDER BY last_access")
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.connection.executemany("DELETE FROM thumbnails WHERE key = ?", evicted)
+
+    def close(self):
+        with self.lock:
+            self._flush_access()
+            self.connection.commit()
+            self.connection.close()
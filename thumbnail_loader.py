@@ -0,0 +1,115 @@
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageTk
+
+from image_grid import THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT
+from instrumentation import span, track_photo
+
+# Режимы, которые ImageTk.PhotoImage умеет показывать без конвертации
+DISPLAY_MODES = ("1", "L", "P", "RGB", "RGBA")
+
+
+def _reducible(image):
+    """Переводит изображение в режим, который Image.reduce() усредняет правильно.
+
+    Для "1" и "I;16" reduce() не работает вовсе, а у палитровых "P" и "PA"
+    усреднялись бы номера цветов палитры, а не сами цвета.
+    """
+    if image.mode == "1":
+        return image.convert("L")
+    if image.mode in ("P", "PA"):
+        return image.convert("RGBA" if image.mode == "PA" or "transparency" in image.info else "RGB")
+    if image.mode.startswith("I;16"):
+        return image.convert("I")
+    return image
+
+
+def decode_thumbnail(file_path, size=(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)):
+    """Декодирует изображение сразу в уменьшенном виде и возвращает миниатюру."""
+    with Image.open(file_path) as image:
+        # Для JPEG декодер сразу уменьшает картинку в 2, 4 или 8 раз
+        image.draft("RGB", size)
+
+        # Целочисленное уменьшение намного дешевле, чем resample полного кадра
+        factor = min(image.width // size[0], image.height // size[1])
+        if factor >= 2:
+            thumbnail = _reducible(image).reduce(factor)
+        else:
+            image.load()
+            thumbnail = image.copy()
+
+    thumbnail.thumbnail(size)
+    if thumbnail.mode not in DISPLAY_MODES:
+        thumbnail = thumbnail.convert("RGB")
+    return thumbnail
+
+
+class ThumbnailLoader:
+    """Декодирует миниатюры в пуле потоков и отдает их в Tk пачками через after()."""
+
+    def __init__(self, widget, on_ready, on_error, cache=None, max_workers=None, batch_size=16, poll_interval=30):
+        self.widget = widget
+        self.cache = cache
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+        self.results = queue.Queue()
+        self.pending = 0
+        self.poll_id = None
+
+    def submit(self, file_path):
+        """Ставит файл в очередь на декодирование."""
+        self.pending += 1
+        self.executor.submit(self._decode, file_path)
+        if self.poll_id is None:
+            self.poll_id = self.widget.after(self.poll_interval, self._drain)
+
+    def _decode(self, file_path):
+        try:
+            # Полное декодирование только если миниатюры нет в кэше
+            with span("thumbnail", "cache.get"):
+                image = self.cache.get(file_path) if self.cache is not None else None
+            if image is None:
+                with span("thumbnail", "decode_thumbnail"):
+                    image = decode_thumbnail(file_path)
+                if self.cache is not None:
+                    self.cache.put(file_path, image)
+            self.results.put((file_path, image, None))
+        except Exception as e:
+            self.results.put((file_path, None, e))
+
+    def _drain(self):
+        """Забирает готовые миниатюры и передает их в интерфейс (только в потоке Tk)."""
+        self.poll_id = None
+        for _ in range(self.batch_size):
+            try:
+                file_path, image, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.pending -= 1
+            if error is not None:
+                self.on_error(file_path, error)
+                continue
+
+            # PhotoImage можно создавать только в главном потоке
+            with span("thumbnail", "PhotoImage"):
+                photo = track_photo(ImageTk.PhotoImage(image), "thumbnail")
+            self.on_ready(file_path, photo)
+
+        if self.pending > 0:
+            self.poll_id = self.widget.after(self.poll_interval, self._drain)
+
+    def shutdown(self):
+        """Останавливает пул и отменяет еще не начатые задачи."""
+        if self.poll_id is not None:
+            self.widget.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.close()
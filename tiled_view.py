@@ -0,0 +1,267 @@
+import math
+import os
+import shutil
+import tempfile
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageTk
+
+from instrumentation import get_logger, track_photo
+
+logger = get_logger("tiled_view")
+
+TILE_SIZE = 256
+TILE_MODES = ("L", "RGB", "RGBA")
+
+
+class ImagePyramid:
+    """Лениво строящаяся пирамида уровней изображения, нарезанных на тайлы на диске.
+
+    Уровень L хранит изображение, уменьшенное в 2**L раз. Уровень декодируется
+    целиком только один раз при первом обращении, после чего в памяти остаются
+    лишь тайлы, попавшие в окно просмотра.
+    """
+
+    def __init__(self, file_path, tile_size=TILE_SIZE):
+        self.file_path = file_path
+        self.tile_size = tile_size
+        with Image.open(file_path) as image:
+            self.width, self.height = image.size
+
+        # Самый грубый уровень помещается в пару тайлов
+        self.top_level = 0
+        while max(self.width, self.height) >> self.top_level > tile_size * 2:
+            self.top_level += 1
+
+        self.directory = tempfile.mkdtemp(prefix="interface-tiles-")
+        self.modes = {}  # уровень -> режим тайлов
+        self.lock = threading.Lock()
+
+    def level_size(self, level):
+        scale = 2 ** level
+        return math.ceil(self.width / scale), math.ceil(self.height / scale)
+
+    def tile_count(self, level):
+        width, height = self.level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def is_built(self, level):
+        return level in self.modes
+
+    def build_level(self, level):
+        """Декодирует уровень и сохраняет его тайлы (вызывается из фонового потока)."""
+        with self.lock:
+            if level in self.modes:
+                return
+
+            size = self.level_size(level)
+            with Image.open(self.file_path) as image:
+                # Для JPEG уменьшение в 2, 4 или 8 раз делает сам декодер
+                image.draft("RGB", size)
+                if image.size != size:
+                    image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+                else:
+                    image.load()
+
+            if image.mode not in TILE_MODES:
+                image = image.convert("RGB")
+
+            columns, rows = self.tile_count(level)
+            for ty in range(rows):
+                for tx in range(columns):
+                    box = (tx * self.tile_size, ty * self.tile_size,
+                           min((tx + 1) * self.tile_size, size[0]), min((ty + 1) * self.tile_size, size[1]))
+                    with open(self._tile_path(level, tx, ty), "wb") as f:
+                        f.write(image.crop(box).tobytes())
+
+            self.modes[level] = image.mode
+
+    def get_tile(self, level, tx, ty):
+        """Читает один тайл уровня с диска."""
+        width, height = self.level_size(level)
+        tile_width = min(self.tile_size, width - tx * self.tile_size)
+        tile_height = min(self.tile_size, height - ty * self.tile_size)
+        with open(self._tile_path(level, tx, ty), "rb") as f:
+            return Image.frombytes(self.modes[level], (tile_width, tile_height), f.read())
+
+    def _tile_path(self, level, tx, ty):
+        return os.path.join(self.directory, f"{level}_{tx}_{ty}.raw")
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class TiledImageWindow(tk.Toplevel):
+    """Окно с масштабированием и панорамированием, которое рисует только видимые тайлы."""
+
+    MAX_MAGNIFY_STEP = 2  # увеличение до 4:1
+
+    def __init__(self, parent, file_path, tile_cache_size=128):
+        super().__init__(parent)
+        self.title(f"Масштаб: {os.path.basename(file_path)}")
+        self.geometry("1000x750")
+
+        self.pyramid = ImagePyramid(file_path)
+        self.tile_cache_size = tile_cache_size
+        self.tiles = OrderedDict()  # (уровень, tx, ty) -> PIL-тайл
+        self.items = {}  # (уровень, увеличение, tx, ty) -> (id на холсте, PhotoImage)
+
+        self.canvas = tk.Canvas(self, bg="gray20", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.building = {}  # уровень -> future
+        self.poll_id = None
+        self.draw_id = None
+
+        # Начальный масштаб: самый детальный уровень, который целиком помещается в окно
+        self.step = -self.pyramid.top_level
+        for level in range(self.pyramid.top_level + 1):
+            width, height = self.pyramid.level_size(level)
+            if width <= 1000 and height <= 750:
+                self.step = -level
+                break
+
+        self.canvas.bind("<Configure>", lambda event: self.schedule_draw())
+        self.canvas.bind("<ButtonPress-1>", lambda event: self.canvas.scan_mark(event.x, event.y))
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom(1 if event.delta > 0 else -1, event.x, event.y))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom(1, event.x, event.y))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom(-1, event.x, event.y))
+        self.bind("<plus>", lambda event: self.zoom(1))
+        self.bind("<minus>", lambda event: self.zoom(-1))
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self._update_scrollregion()
+
+    @property
+    def level(self):
+        return max(0, -self.step)
+
+    @property
+    def magnify(self):
+        return 2 ** max(0, self.step)
+
+    @property
+    def zoom_factor(self):
+        return 2.0 ** self.step
+
+    def zoom(self, direction, x=None, y=None):
+        """Меняет масштаб вдвое, сохраняя под курсором ту же точку изображения."""
+        step = max(-self.pyramid.top_level, min(self.MAX_MAGNIFY_STEP, self.step + direction))
+        if step == self.step:
+            return
+
+        if x is None:
+            x, y = self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2
+        image_x = self.canvas.canvasx(x) / self.zoom_factor
+        image_y = self.canvas.canvasy(y) / self.zoom_factor
+
+        self.step = step
+        width, height = self._update_scrollregion()
+        self.canvas.xview_moveto(max(0.0, (image_x * self.zoom_factor - x) / width))
+        self.canvas.yview_moveto(max(0.0, (image_y * self.zoom_factor - y) / height))
+        self.schedule_draw()
+
+    def _update_scrollregion(self):
+        width, height = self.pyramid.level_size(self.level)
+        width, height = width * self.magnify, height * self.magnify
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        return width, height
+
+    def _on_drag(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.schedule_draw()
+
+    def schedule_draw(self):
+        if self.draw_id is None:
+            self.draw_id = self.after_idle(self.draw)
+
+    def draw(self):
+        """Показывает тайлы, пересекающиеся с окном, и удаляет все остальные."""
+        self.draw_id = None
+        level, magnify = self.level, self.magnify
+        if not self.pyramid.is_built(level):
+            self._build(level)
+            return
+        self.canvas.delete("loading")
+
+        span = self.pyramid.tile_size * magnify
+        columns, rows = self.pyramid.tile_count(level)
+        x0, y0 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        x1, y1 = x0 + self.canvas.winfo_width(), y0 + self.canvas.winfo_height()
+        visible = {(level, magnify, tx, ty)
+                   for ty in range(max(0, int(y0 // span)), min(rows, int(y1 // span) + 1))
+                   for tx in range(max(0, int(x0 // span)), min(columns, int(x1 // span) + 1))}
+
+        for key in [key for key in self.items if key not in visible]:
+            item, _ = self.items.pop(key)
+            self.canvas.delete(item)
+
+        for key in visible - self.items.keys():
+            _, _, tx, ty = key
+            tile = self._get_tile(level, tx, ty)
+            if magnify > 1:
+                tile = tile.resize((tile.width * magnify, tile.height * magnify), Image.Resampling.NEAREST)
+            photo = track_photo(ImageTk.PhotoImage(tile), "tile")
+            item = self.canvas.create_image(tx * span, ty * span, anchor=tk.NW, image=photo)
+            self.items[key] = (item, photo)
+
+    def _get_tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.pyramid.get_tile(level, tx, ty)
+            self.tiles[key] = tile
+            while len(self.tiles) > self.tile_cache_size:
+                self.tiles.popitem(last=False)
+        else:
+            self.tiles.move_to_end(key)
+        return tile
+
+    def _build(self, level):
+        if level not in self.building:
+            self.building[level] = self.executor.submit(self.pyramid.build_level, level)
+            self.canvas.delete("loading")
+            self.canvas.create_text(self.canvas.canvasx(20), self.canvas.canvasy(20), anchor=tk.NW,
+                                    text="Загрузка...", fill="white", tags="loading")
+        if self.poll_id is None:
+            self.poll_id = self.after(50, self._poll_build)
+
+    def _poll_build(self):
+        self.poll_id = None
+        for level, future in list(self.building.items()):
+            if not future.done():
+                continue
+            del self.building[level]
+            error = future.exception()
+            if error is not None:
+                logger.error("Не удалось построить уровень изображения: %s", error)
+            elif level == self.level:
+                self.schedule_draw()
+        if self.building:
+            self.poll_id = self.after(50, self._poll_build)
+
+    def close(self):
+        self.destroy()
+
+    def destroy(self):
+        """Освобождает пул и временные тайлы; вызывается и при уничтожении окна вместе с родителем."""
+        if self.poll_id is not None:
+            self.after_cancel(self.poll_id)
+            self.poll_id = None
+        if self.draw_id is not None:
+            self.after_cancel(self.draw_id)
+            self.draw_id = None
+        # Окно не ждет построения уровня: папка с тайлами удаляется, когда он допишет свои тайлы
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        running = [future for future in self.building.values() if not future.done()]
+        if running:
+            running[0].add_done_callback(lambda future: self.pyramid.close())
+        else:
+            self.pyramid.close()
+        self.building.clear()
+        super().destroy()